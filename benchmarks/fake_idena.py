@@ -0,0 +1,141 @@
+import json
+import time
+import random
+import threading
+
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+class Dataset:
+    """ Transactions of the option addresses of one vote. Every voter sends
+    one transaction to a random option, 'revotes' of them send another one
+    later and 'verified' of all voters have a verified identity """
+
+    def __init__(self, voters, options=4, verified=0.8, revotes=0.1, seed=1):
+        rnd = random.Random(seed)
+
+        self.options = [f"Option {i + 1}" for i in range(options)]
+        self.addresses = [f"0x{rnd.getrandbits(160):040x}" for _ in range(options)]
+        self.voters = [f"0x{rnd.getrandbits(160):040x}" for _ in range(voters)]
+        self.states = {v: "Verified" if rnd.random() < verified else "Newbie" for v in self.voters}
+
+        # Option address -> transactions, newest first
+        self.transactions = {a: list() for a in self.addresses}
+
+        start = datetime(2020, 1, 1)
+        count = 0
+
+        votes = [(v, rnd.randrange(options)) for v in self.voters]
+        votes += [(v, rnd.randrange(options)) for v in self.voters if rnd.random() < revotes]
+
+        for voter, option in votes:
+            timestamp = start + timedelta(seconds=count)
+
+            self.transactions[self.addresses[option]].append({
+                "hash": f"0x{count:064x}",
+                "type": "SendTx",
+                "from": voter,
+                "to": self.addresses[option],
+                "amount": "0.1",
+                "timestamp": timestamp.strftime("%Y-%m-%dT%H:%M:%SZ")})
+
+            count += 1
+
+        for transactions in self.transactions.values():
+            transactions.reverse()
+
+        self.created = start.strftime("%Y-%m-%d %H:%M:%S")
+
+
+class FakeIdenaServer:
+    """ Local HTTP server that answers the IDENA API requests that
+    the bot uses with data from a Dataset. Every response is delayed
+    by 'latency' seconds. Requests are counted per endpoint """
+
+    def __init__(self, dataset, latency=0.0):
+        self.dataset = dataset
+        self.latency = latency
+        self.requests = {"txs": 0, "identity": 0, "epoch": 0}
+
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/api/"
+
+    @property
+    def request_count(self):
+        with self._lock:
+            return sum(self.requests.values())
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _count(self, endpoint):
+        with self._lock:
+            self.requests[endpoint] += 1
+
+    def _response(self, path, query):
+        """ Return response for given API path as dict """
+        parts = path.strip("/").split("/")[1:]
+        data = self.dataset
+
+        # address/{address}/txs?skip=&limit=
+        if len(parts) == 3 and parts[0] == "address" and parts[2] == "txs":
+            self._count("txs")
+
+            skip = int(query.get("skip", ["0"])[0])
+            limit = int(query.get("limit", ["50"])[0])
+            page = data.transactions.get(parts[1], [])[skip:skip + limit]
+
+            return {"result": page or None}
+
+        # identity/{address}
+        if len(parts) == 2 and parts[0] == "identity":
+            self._count("identity")
+            return {"result": {"address": parts[1], "state": data.states.get(parts[1], "Undefined")}}
+
+        # epoch/last
+        if parts == ["epoch", "last"]:
+            self._count("epoch")
+            return {"result": {"epoch": 1, "validationTime": "2099-01-01T00:00:00Z"}}
+
+        return {"error": {"message": f"Unknown path {path}", "code": 404}}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep connections alive like the real API
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                body = json.dumps(server._response(url.path, parse_qs(url.query))).encode()
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
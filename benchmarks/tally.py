@@ -0,0 +1,239 @@
+"""
+Benchmark for counting votes and rendering result charts without network.
+
+Starts a local stand-in for the IDENA API (see 'fake_idena.py') and uses the
+same path as the 'Show Results' buttons of the Start and Show plugins:
+TallyEngine.tally() with TransactionSync and IdenaAPI, then ChartCache.
+
+Usage: python -m benchmarks.tally --voters 10,1000,100000 --latency 0.005
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import tempfile
+import tracemalloc
+import idena.constants as con
+
+from argparse import ArgumentParser
+from benchmarks.fake_idena import Dataset, FakeIdenaServer
+from idena.chart import ChartCache
+from idena.database import Database
+from idena.idena_api import IdenaAPI
+from idena.resources import ResourceCache
+from idena.sync import TransactionSync
+from idena.tally import TallyEngine, TallyCache
+
+
+class Config:
+    """ Replaces the global config of the bot """
+
+    def __init__(self, cfg):
+        self._cfg = cfg
+
+    def get(self, *keys):
+        value = self._cfg
+
+        try:
+            for key in keys:
+                value = value[key]
+        except (KeyError, TypeError):
+            return None
+
+        return value
+
+
+class BenchPlugin:
+    """ Provides what TallyEngine and TransactionSync need from an
+    IdenaPlugin, with the same global resources and a temporary database """
+
+    def __init__(self, api, db_path):
+        self.api = api
+        self.global_config = Config({"database": {"use_db": True}})
+
+        self._db = Database.get(db_path)
+        self._db.migrate(os.path.join(con.DIR_RES, con.DIR_MIG))
+
+        self._resources = ResourceCache()
+        self._resources.load(con.DIR_RES)
+
+        self.sync = TransactionSync(self)
+        self.tally = TallyEngine(self, cache=TallyCache())
+
+    def get_global_resource(self, filename):
+        return self._resources.get(con.DIR_RES, filename)
+
+    def execute_global_sql(self, sql, *args):
+        try:
+            return {"success": True, "data": self._db.execute(sql, *args)}
+        except Exception as e:
+            return {"success": False, "data": str(e)}
+
+    def global_transaction(self):
+        return self._db.transaction()
+
+
+def percentile(values, percent):
+    """ Return percentile of given values (nearest rank) """
+    values = sorted(values)
+    index = max(0, min(len(values) - 1, round(percent / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def measure(fn, runs):
+    """ Execute function 'runs' times and return list of durations in ms """
+    durations = list()
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - start) * 1000)
+
+    return durations
+
+
+def stats(durations, requests=None):
+    res = {
+        "p50_ms": round(percentile(durations, 50), 3),
+        "p99_ms": round(percentile(durations, 99), 3)
+    }
+
+    if requests is not None:
+        res["requests"] = requests
+
+    return res
+
+
+def bench(voters, options, latency, runs, workdir):
+    """ Return results for one dataset size """
+    dataset = Dataset(voters, options=options)
+    server = FakeIdenaServer(dataset, latency=latency).start()
+    api = IdenaAPI(base_url=server.base_url, timeout=30)
+
+    try:
+        plg = BenchPlugin(api, os.path.join(workdir, f"bench_{voters}.db"))
+
+        vote_id = f"bench{voters}"
+
+        with plg.global_transaction() as cur:
+            cur.execute(
+                plg.get_global_resource("insert_vote.sql"),
+                (vote_id, 0, f"Benchmark with {voters} voters?", None))
+            cur.executemany(
+                plg.get_global_resource("insert_option.sql"),
+                [(vote_id, o, a, "") for o, a in zip(dataset.options, dataset.addresses)])
+
+        res = {"voters": voters, "options": options}
+
+        # First request - all transactions and identities are downloaded
+        start = server.request_count
+        result = None
+
+        def _cold():
+            nonlocal result
+            result = plg.tally.tally(vote_id)
+
+        res["cold"] = stats(measure(_cold, 1), server.request_count - start)
+        res["votes"] = result.total_votes
+
+        # Result outdated - new transactions are checked and votes counted again
+        def _recount():
+            TallyEngine(plg, cache=TallyCache()).tally(vote_id)
+
+        start = server.request_count
+        durations = measure(_recount, runs)
+        res["recount"] = stats(durations, round((server.request_count - start) / runs, 1))
+
+        # Counting only, with transactions from the database
+        transactions = {a: plg.sync.local_transactions_for(a) for a in dataset.addresses}
+
+        for name, vector_min in (("count_python", sys.maxsize), ("count_numpy", 0)):
+            engine = TallyEngine(plg, cache=TallyCache(), vector_min=vector_min)
+            res[name] = stats(measure(lambda: engine.count(engine.load(vote_id), transactions), runs))
+
+        # Result still valid - returned from cache
+        start = server.request_count
+        durations = measure(lambda: plg.tally.tally(vote_id), runs)
+        res["cached"] = stats(durations, server.request_count - start)
+
+        # Chart for result - rendered and from cache
+        charts = ChartCache()
+        res["chart_render"] = stats(measure(lambda: charts.render(result), runs))
+        res["chart_cached"] = stats(measure(lambda: charts.photo(result), runs))
+
+        # Memory allocated while counting again
+        tracemalloc.start()
+        _recount()
+        res["recount_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+        tracemalloc.stop()
+
+        res["requests_by_endpoint"] = dict(server.requests)
+        return res
+    finally:
+        api.close()
+        server.stop()
+
+
+def peak_rss_mb():
+    try:
+        import resource
+
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024, 1)
+    except ImportError:
+        return None
+
+
+def print_table(results):
+    header = (
+        f"{'voters':>8} {'votes':>7} {'cold ms':>10} {'cold req':>9} "
+        f"{'recount p50':>12} {'p99':>9} {'req':>6} {'count py':>9} {'count np':>9} {'cached p50':>11} "
+        f"{'chart p50':>10} {'p99':>8} {'peak MB':>8} {'RSS MB':>7}")
+
+    print(header)
+    print("-" * len(header))
+
+    for r in results:
+        print(
+            f"{r['voters']:>8} {r['votes']:>7} {r['cold']['p50_ms']:>10.1f} {r['cold']['requests']:>9} "
+            f"{r['recount']['p50_ms']:>12.2f} {r['recount']['p99_ms']:>9.2f} {r['recount']['requests']:>6} "
+            f"{r['count_python']['p50_ms']:>9.2f} {r['count_numpy']['p50_ms']:>9.2f} "
+            f"{r['cached']['p50_ms']:>11.4f} {r['chart_render']['p50_ms']:>10.2f} "
+            f"{r['chart_render']['p99_ms']:>8.2f} {r['recount_peak_mb']:>8} {r['peak_rss_mb']:>7}")
+
+
+def main():
+    parser = ArgumentParser(description="Benchmark vote counting with a local IDENA API")
+    parser.add_argument("--voters", default="10,100,1000,10000,100000",
+                        help="comma separated number of voters per dataset")
+    parser.add_argument("--options", type=int, default=4, help="options per vote")
+    parser.add_argument("--latency", type=float, default=0.001, help="seconds per API response")
+    parser.add_argument("--runs", type=int, default=20, help="measurements per value")
+    parser.add_argument("--json", dest="json_file", default=None, help="save results to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    workdir = tempfile.mkdtemp(prefix="idena_bench_")
+    results = list()
+
+    try:
+        for voters in [int(v) for v in args.voters.split(",")]:
+            res = bench(voters, args.options, args.latency, args.runs, workdir)
+            res["peak_rss_mb"] = peak_rss_mb()
+            results.append(res)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results)
+
+    if args.json_file:
+        with open(args.json_file, "w", encoding="utf8") as f:
+            json.dump({"latency": args.latency, "runs": args.runs, "results": results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
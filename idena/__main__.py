@@ -1,3 +1,11 @@
+import sys
+
+from idena.profiler import StartupProfiler
+
+# Needs to be enabled before anything else gets imported
+if "--profile-startup" in sys.argv:
+    StartupProfiler.get().enable()
+
 from idena.start import Idena
 
 # Entry point for bot
@@ -0,0 +1,72 @@
+import time
+import logging
+
+from threading import Lock
+from idena.tally import TallyEngine
+
+
+class AddressIndex:
+    """ Maps the option addresses of all open votes to their vote. Every
+    entry is a tuple (vote ID, index of option, end of vote as UNIX timestamp
+    or None). Use it to find the vote of a transaction without the database """
+
+    def __init__(self):
+        # Address -> (vote ID, option index, ending)
+        self._entries = dict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self, plugin, since):
+        """ Replace content with all votes that didn't end before the UNIX
+        timestamp 'since'. End of votes is saved in local time. Return FALSE on error """
+        sql = plugin.get_global_resource("select_open_options.sql")
+        res = plugin.execute_global_sql(sql, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(since)))
+
+        if not res["success"]:
+            logging.error(f"Not possible to load open votes: {res['data']}")
+            return False
+
+        entries = dict()
+        # Vote ID -> number of options so far
+        options = dict()
+
+        for address, vote_id, ending in res["data"]:
+            option = options.get(vote_id, 0)
+            options[vote_id] = option + 1
+
+            entries[address] = (vote_id, option, TallyEngine.local_to_unix(ending))
+
+        with self._lock:
+            self._entries = entries
+
+        logging.info(f"Address index loaded with {len(options)} votes")
+        return True
+
+    def add(self, vote_id, ending, addresses):
+        """ Add new vote. 'addresses' are the addresses of the options in their
+        order and 'ending' is the end as string from the database or None """
+        ending = TallyEngine.local_to_unix(ending)
+
+        with self._lock:
+            for option, address in enumerate(addresses):
+                self._entries[address] = (vote_id, option, ending)
+
+    def get(self, address):
+        """ Return (vote ID, option index, ending) for given address or None """
+        return self._entries.get(address)
+
+    def resolve(self, trx):
+        """ Return (vote ID, option index, ending) for
+        the receiver of given transaction or None """
+        return self._entries.get(trx.get("to"))
+
+    def addresses(self):
+        """ Return list of all addresses """
+        return list(self._entries)
+
+    def prune(self, before):
+        """ Remove votes that ended before given UNIX timestamp """
+        with self._lock:
+            self._entries = {a: e for a, e in self._entries.items() if not e[2] or e[2] >= before}
@@ -0,0 +1,253 @@
+import io
+import logging
+import importlib
+import textwrap
+
+from io import BytesIO
+from threading import Lock
+from collections import OrderedDict
+
+
+class PlotlyChart:
+    """ Bar chart rendered with plotly. Needs pandas, plotly and kaleido """
+
+    @staticmethod
+    def warm_up():
+        """ Import modules needed for rendering """
+        for name in ("pandas", "plotly.express", "plotly.io"):
+            importlib.import_module(name)
+
+    @staticmethod
+    def render(result):
+        """ Return bar chart for given TallyResult as JPEG """
+        import pandas as pd
+        import plotly.express as px
+        import plotly.io as pio
+
+        data = {
+            "Options": result.options,
+            "Votes": result.counts
+        }
+
+        fig = px.bar(
+            pd.DataFrame(data=data),
+            x="Options",
+            y="Votes",
+            title=result.question)
+
+        return pio.to_image(fig, format="jpeg")
+
+
+class PillowChart:
+    """ Bar chart drawn with Pillow. Shows the same information as the
+    plotly chart but only takes a few milliseconds and little memory """
+
+    WIDTH = 700
+    HEIGHT = 500
+    MARGIN = 60
+
+    BACKGROUND = (255, 255, 255)
+    PLOT_AREA = (229, 236, 246)
+    GRID = (255, 255, 255)
+    BAR = (99, 110, 250)
+    TEXT = (42, 63, 95)
+
+    @staticmethod
+    def warm_up():
+        """ Import modules needed for rendering """
+        for name in ("PIL.Image", "PIL.ImageDraw", "PIL.ImageFont"):
+            importlib.import_module(name)
+
+    @staticmethod
+    def _font(size):
+        from PIL import ImageFont
+
+        # Scalable default font needs Pillow 10.1 or newer
+        try:
+            return ImageFont.load_default(size=size)
+        except TypeError:
+            return ImageFont.load_default()
+
+    @staticmethod
+    def _step(max_value, ticks=5):
+        """ Return distance between grid lines as 1, 2 or 5 times a power of 10 """
+        step = 1
+
+        while max_value / step > ticks:
+            for factor in (2, 5 / 2, 2):
+                step = int(step * factor)
+                if max_value / step <= ticks:
+                    break
+
+        return step
+
+    @staticmethod
+    def _lines(draw, text, font, width):
+        """ Wrap text into lines that fit into the given width in pixels """
+        char_width = max(draw.textlength("x", font=font), 1)
+        return textwrap.wrap(str(text), width=max(int(width / char_width), 1)) or [""]
+
+    @classmethod
+    def render(cls, result):
+        """ Return bar chart for given TallyResult as PNG """
+        from PIL import Image, ImageDraw
+
+        image = Image.new("RGB", (cls.WIDTH, cls.HEIGHT), cls.BACKGROUND)
+        draw = ImageDraw.Draw(image)
+
+        title_font = cls._font(20)
+        font = cls._font(14)
+
+        # Title
+        y = 15
+        for line in cls._lines(draw, result.question, title_font, cls.WIDTH - 2 * cls.MARGIN)[:2]:
+            draw.text((cls.MARGIN, y), line, fill=cls.TEXT, font=title_font)
+            y += 25
+
+        left = cls.MARGIN
+        top = y + 20
+        right = cls.WIDTH - 20
+        bottom = cls.HEIGHT - 70
+
+        draw.rectangle((left, top, right, bottom), fill=cls.PLOT_AREA)
+
+        # Horizontal grid with number of votes
+        step = cls._step(max(result.counts, default=0))
+        top_value = max(max(result.counts, default=0), 1)
+        top_value = ((top_value + step - 1) // step) * step
+        scale = (bottom - top) / top_value
+
+        for value in range(0, top_value + 1, step):
+            y = bottom - value * scale
+            draw.line((left, y, right, y), fill=cls.GRID, width=1)
+            label = str(value)
+            draw.text((left - 8 - draw.textlength(label, font=font), y - 8), label, fill=cls.TEXT, font=font)
+
+        draw.text((10, top - 20), "Votes", fill=cls.TEXT, font=font)
+
+        # One bar per option with option below it
+        if result.options:
+            slot = (right - left) / len(result.options)
+
+            for i, (option, votes) in enumerate(zip(result.options, result.counts)):
+                x0 = left + i * slot + slot * 0.1
+                x1 = left + (i + 1) * slot - slot * 0.1
+
+                if votes:
+                    draw.rectangle((x0, bottom - votes * scale, x1, bottom), fill=cls.BAR)
+
+                label = str(votes)
+                label_x = (x0 + x1 - draw.textlength(label, font=font)) / 2
+                draw.text((label_x, bottom - votes * scale - 18), label, fill=cls.TEXT, font=font)
+
+                y = bottom + 8
+                for line in cls._lines(draw, option, font, slot * 0.9)[:3]:
+                    line_x = (x0 + x1 - draw.textlength(line, font=font)) / 2
+                    draw.text((line_x, y), line, fill=cls.TEXT, font=font)
+                    y += 17
+
+        data = BytesIO()
+        image.save(data, format="PNG")
+        return data.getvalue()
+
+
+class ChartCache:
+    """ Keeps rendered result charts so that they don't need to be rendered
+    again for the same result. If the size of all charts together gets bigger
+    than 'cache_size' MB, the least recently used ones will be removed. Also
+    remembers the Telegram file ID of charts that were already uploaded """
+
+    BACKENDS = {
+        "pillow": PillowChart,
+        "plotly": PlotlyChart
+    }
+
+    backend = "pillow"
+    cache_size = 20  # MB
+    file_ids = 1000  # Max number of remembered file IDs
+
+    def __init__(self, backend=None, cache_size=None):
+        if backend:
+            if backend in self.BACKENDS:
+                self.backend = backend
+            else:
+                logging.error(f"Chart backend '{backend}' unknown. Using '{self.backend}'")
+        if cache_size is not None:
+            self.cache_size = cache_size
+
+        self._renderer = self.BACKENDS[self.backend]
+
+        # Key -> image as bytes
+        self._images = OrderedDict()
+        # Key -> Telegram file ID
+        self._file_ids = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def _key(result):
+        """ Chart only changes if the number of votes changes """
+        return result.vote_id, tuple(result.counts)
+
+    def warm_up(self):
+        """ Import modules of the backend so that the first chart isn't slower """
+        try:
+            self._renderer.warm_up()
+        except Exception as e:
+            logging.error(f"{repr(e)} - Chart backend '{self.backend}' not available")
+
+    def render(self, result):
+        """ Return bar chart for given TallyResult """
+        return self._renderer.render(result)
+
+    def image(self, result):
+        """ Return chart for given TallyResult as bytes """
+        key = self._key(result)
+
+        with self._lock:
+            image = self._images.get(key)
+
+            if image:
+                self._images.move_to_end(key)
+                return image
+
+        image = self.render(result)
+
+        with self._lock:
+            if key not in self._images:
+                self._images[key] = image
+                self._bytes += len(image)
+
+            while self._images and self._bytes > self.cache_size * 1024 * 1024:
+                _, old = self._images.popitem(last=False)
+                self._bytes -= len(old)
+
+        return image
+
+    def photo(self, result):
+        """ Return Telegram file ID of the chart if it was already
+        uploaded, otherwise the chart as a file-like object """
+        key = self._key(result)
+
+        with self._lock:
+            file_id = self._file_ids.get(key)
+
+            if file_id:
+                self._file_ids.move_to_end(key)
+                return file_id
+
+        return io.BufferedReader(BytesIO(self.image(result)))
+
+    def uploaded(self, result, message):
+        """ Remember file ID of chart that was sent with given message """
+        try:
+            file_id = message.photo[-1].file_id
+        except Exception as e:
+            logging.debug(f"{repr(e)} - No photo in message")
+            return
+
+        with self._lock:
+            self._file_ids[self._key(result)] = file_id
+
+            while len(self._file_ids) > self.file_ids:
+                self._file_ids.popitem(last=False)
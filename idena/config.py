@@ -1,139 +1,200 @@
 import os
 import json
+import copy
 import logging
 import types
 import idena.constants as con
 
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+from threading import Lock
+from types import MappingProxyType
+from idena.watcher import FileWatcher
 
 
-class ConfigManager(FileSystemEventHandler):
+class ConfigSnapshot:
+    """ Read-only content of a configuration file at one point in time.
+    Dicts are read-only mappings and lists are tuples. Looked up values
+    are remembered so that the next lookup of the same keys is only one
+    dict access. Never changes, so it can be read from any thread """
+
+    _MISSING = object()
+
+    def __init__(self, data, name=""):
+        # Plain content as read from the file. Don't change it
+        self.data = data
+        self.name = name
+
+        self._root = self._freeze(data)
+        # Keys -> value
+        self._values = dict()
+        # Keys -> value as frozenset
+        self._sets = dict()
+
+    @classmethod
+    def _freeze(cls, value):
+        if isinstance(value, dict):
+            return MappingProxyType({k: cls._freeze(v) for k, v in value.items()})
+        if isinstance(value, list):
+            return tuple(cls._freeze(v) for v in value)
+        return value
+
+    def get(self, keys):
+        """ Return value for given tuple of keys or None if it doesn't exist """
+        value = self._values.get(keys, self._MISSING)
+
+        if value is self._MISSING:
+            value = self._root
+
+            try:
+                for key in keys:
+                    value = value[key]
+            except Exception as e:
+                err = f"Can't get '{keys}' from '{self.name}'"
+                logging.debug(f"{repr(e)} - {err}")
+                value = None
+
+            self._values[keys] = value
+
+        return value
+
+    def get_set(self, keys):
+        """ Return value for given tuple of keys as frozenset. Empty
+        if it doesn't exist or isn't a list of hashable values """
+        values = self._sets.get(keys)
+
+        if values is None:
+            value = self.get(keys)
+
+            try:
+                values = frozenset(value) if isinstance(value, tuple) else frozenset()
+            except TypeError:
+                values = frozenset()
+
+            self._sets[keys] = values
+
+        return values
+
+
+class ConfigManager:
 
     _cfg_file = con.FILE_CFG
-    _cfg = dict()
 
     _callback = None
-    _ignore = False
-    _old = 0
+    _written = None
 
     def __init__(self, config_file, callback=None):
         self._cfg_file = config_file
         self._callback = callback
 
+        # Only replaced as a whole, never changed
+        self._snapshot = ConfigSnapshot(dict(), self._cfg_file)
+        # Makes sure that changes aren't lost if 'set' runs in parallel
+        self._write_lock = Lock()
+
+        self._read_cfg()
+
         # Watch for config file changes
-        observer = Observer()
-        observer.schedule(self, os.path.dirname(self._cfg_file))
-        observer.start()
+        FileWatcher.get().watch(self._cfg_file, self._on_change)
 
-    def on_modified(self, event):
+    def _on_change(self, path):
         """ Will be triggered if the config file has been changed manually.
          Will also execute the callback method if there is one """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return
 
-        if event.src_path == self._cfg_file:
-            stat = os.stat(event.src_path)
-            new = stat.st_mtime
-
-            # Workaround for watchdog bug
-            # https://github.com/gorakhargosh/watchdog/issues/93
-            if (new - self._old) > 0.5:
-                if self._ignore:
-                    self._ignore = False
-                else:
-                    self._read_cfg()
-
-            self._old = new
+        # Changes done with 'set' or 'remove' are already known
+        if mtime != self._written:
+            self._read_cfg()
 
-            if isinstance(self._callback, types.FunctionType):
-                self._callback(self._cfg, None, None)
+        if isinstance(self._callback, types.FunctionType):
+            self._callback(self._snapshot.data, None, None)
 
     def _read_cfg(self):
         """ Read the JSON content of a given configuration file """
         try:
             if os.path.isfile(self._cfg_file):
                 with open(self._cfg_file) as config_file:
-                    self._cfg = json.load(config_file)
+                    self._snapshot = ConfigSnapshot(json.load(config_file), self._cfg_file)
         except Exception as e:
             err = f"Can't read '{self._cfg_file}'"
             logging.error(f"{repr(e)} - {err}")
 
-    def _write_cfg(self):
-        """ Write the JSON dictionary into the given configuration file """
+    def _write_cfg(self, cfg):
+        """ Write the JSON dictionary into the given configuration
+        file and use it as new content of the configuration """
         try:
             if not os.path.exists(os.path.dirname(self._cfg_file)):
                 os.makedirs(os.path.dirname(self._cfg_file))
             with open(self._cfg_file, "w") as config_file:
-                json.dump(self._cfg, config_file, indent=4)
+                json.dump(cfg, config_file, indent=4)
+            self._written = os.stat(self._cfg_file).st_mtime_ns
         except Exception as e:
             err = f"Can't write '{self._cfg_file}'"
             logging.error(f"{repr(e)} - {err}")
 
-    def get(self, *keys):
-        """ Return the value of the given key(s) from a configuration file """
-        if not self._cfg:
-            self._read_cfg()
+        self._snapshot = ConfigSnapshot(cfg, self._cfg_file)
 
-        if not keys:
-            return self._cfg
+    def snapshot(self):
+        """ Return current content of the configuration file. Use it
+        if more than one value needs to be read from the same version """
+        return self._snapshot
 
-        value = self._cfg
+    def get(self, *keys):
+        """ Return the value of the given key(s) from a configuration file.
+        Without keys, the whole content is returned. Dicts are
+        returned as read-only mappings and lists as tuples """
+        return self._snapshot.get(keys)
 
-        try:
-            for key in keys:
-                value = value[key]
-        except Exception as e:
-            err = f"Can't get '{keys}' from '{self._cfg_file}'"
-            logging.debug(f"{repr(e)} - {err}")
-            return None
-
-        return value
+    def get_set(self, *keys):
+        """ Return the list for the given key(s) as frozenset.
+        Empty if it doesn't exist. Use for fast lookups (admin IDs) """
+        return self._snapshot.get_set(keys)
 
     def set(self, value, *keys):
         """ Set a new value for the given key(s) in the configuration file.
         Will also execute the callback method if there is one """
-        if not self._cfg:
-            self._read_cfg()
-
         if not keys:
             return
 
-        tmp_cfg = self._cfg
+        with self._write_lock:
+            cfg = copy.deepcopy(self._snapshot.data)
+            tmp_cfg = cfg
 
-        try:
-            for key in keys[:-1]:
-                tmp_cfg = tmp_cfg.setdefault(key, {})
-            tmp_cfg[keys[-1]] = value
+            try:
+                for key in keys[:-1]:
+                    tmp_cfg = tmp_cfg.setdefault(key, {})
+                tmp_cfg[keys[-1]] = value
 
-            self._ignore = True
-            self._write_cfg()
+                self._write_cfg(cfg)
+            except Exception as e:
+                err = f"Can't set '{keys}' in '{self._cfg_file}'"
+                logging.debug(f"{repr(e)} - {err}")
+                return
 
-            if isinstance(self._callback, types.FunctionType):
-                self._callback(self._cfg, value, *keys)
-        except Exception as e:
-            err = f"Can't set '{keys}' in '{self._cfg_file}'"
-            logging.debug(f"{repr(e)} - {err}")
+        if isinstance(self._callback, types.FunctionType):
+            self._callback(cfg, value, *keys)
 
     def remove(self, *keys):
         """ Remove given key(s) from the configuration file.
         Will also execute the callback method if there is one """
-        if not self._cfg:
-            self._read_cfg()
-
         if not keys:
             return
 
-        tmp_cfg = self._cfg
+        with self._write_lock:
+            cfg = copy.deepcopy(self._snapshot.data)
+            tmp_cfg = cfg
 
-        try:
-            for key in keys[:-1]:
-                tmp_cfg = tmp_cfg.setdefault(key, {})
-            del tmp_cfg[keys[-1]]
-
-            self._ignore = True
-            self._write_cfg()
-
-            if isinstance(self._callback, types.FunctionType):
-                self._callback(self._cfg, None, *keys)
-        except KeyError as e:
-            err = f"Can't remove key '{keys}' from '{self._cfg_file}'"
-            logging.debug(f"{repr(e)} - {err}")
+            try:
+                for key in keys[:-1]:
+                    tmp_cfg = tmp_cfg.setdefault(key, {})
+                del tmp_cfg[keys[-1]]
+
+                self._write_cfg(cfg)
+            except KeyError as e:
+                err = f"Can't remove key '{keys}' from '{self._cfg_file}'"
+                logging.debug(f"{repr(e)} - {err}")
+                return
+
+        if isinstance(self._callback, types.FunctionType):
+            self._callback(cfg, None, *keys)
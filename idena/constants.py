@@ -3,6 +3,7 @@ import os
 # Project folders
 DIR_SRC = os.path.basename(os.path.dirname(__file__))
 DIR_RES = "resources"
+DIR_MIG = "migrations"
 DIR_PLG = "plugins"
 DIR_CFG = "config"
 DIR_LOG = "logs"
@@ -14,6 +15,7 @@ FILE_DAT = "global.db"
 FILE_CFG = "config.json"
 FILE_TKN = "token.json"
 FILE_LOG = f"{DIR_SRC}.log"
+FILE_PRF = "startup_profile.json"
 
 # Max Telegram message length
 MAX_TG_MSG_LEN = 4096
@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import threading
+
+from contextlib import contextmanager
+
+
+class Database:
+    """ Access to one SQLite database. Every thread gets its own connection
+    that stays open and will be reused for all statements of that thread.
+    Use 'Database.get(path)' so that there is only one instance per file """
+
+    synchronous = "NORMAL"  # Safe with WAL and no fsync on every commit
+    cache_size = 16000  # kB for page cache per connection
+
+    _instances = dict()
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    @classmethod
+    def get(cls, path):
+        """ Return database for given file """
+        path = os.path.abspath(path)
+
+        with cls._instances_lock:
+            if path not in cls._instances:
+                cls._instances[path] = cls(path)
+
+            return cls._instances[path]
+
+    def exists(self):
+        """ Return TRUE if the database file exists """
+        return os.path.isfile(self.path)
+
+    def connection(self):
+        """ Return connection for current thread. Will
+        be created (together with the file) if needed """
+        con = getattr(self._local, "con", None)
+
+        if con is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+            con = sqlite3.connect(self.path)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute(f"PRAGMA synchronous={self.synchronous}")
+            con.execute(f"PRAGMA cache_size=-{self.cache_size}")
+
+            self._local.con = con
+
+        return con
+
+    def execute(self, sql, *args):
+        """ Execute raw SQL statement and return resulting
+        rows. Exceptions will be raised after a rollback """
+        con = self.connection()
+
+        try:
+            data = con.execute(sql, args).fetchall()
+            con.commit()
+            return data
+        except Exception:
+            con.rollback()
+            raise
+
+    def check(self, sql):
+        """ Prepare given SQL statement without executing it. Raises
+        an exception if it's invalid for the tables of this database """
+        self.connection().execute(f"EXPLAIN {sql}", [None] * sql.count("?")).fetchall()
+
+    def migrate(self, directory):
+        """ Apply all SQL files in given directory that weren't applied yet.
+        Files need to start with their version number ('002_indexes.sql') and
+        the version of the last applied file is saved as 'user_version' """
+        con = self.connection()
+        current = con.execute("PRAGMA user_version").fetchone()[0]
+        applied = list()
+
+        for file in sorted(os.listdir(directory)):
+            if not file.endswith(".sql"):
+                continue
+
+            version = int(file.split("_", 1)[0])
+
+            if version <= current:
+                continue
+
+            with open(os.path.join(directory, file), encoding="utf8") as f:
+                script = f.read()
+
+            try:
+                con.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;")
+            except Exception:
+                con.rollback()
+                raise
+
+            applied.append(file)
+
+        return applied
+
+    @contextmanager
+    def transaction(self):
+        """ Context manager that returns a cursor. All statements will be
+        committed at once at the end or rolled back if there was an error """
+        con = self.connection()
+        cur = con.cursor()
+
+        try:
+            yield cur
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+        finally:
+            cur.close()
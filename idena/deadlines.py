@@ -0,0 +1,140 @@
+import heapq
+import logging
+
+from threading import Lock
+from datetime import datetime
+
+
+class DeadlineScheduler:
+    """ Executes a callback once for every vote when it ends. Pending votes
+    are kept in a min-heap ordered by end date and there is only one job in
+    the JobQueue, for the vote that ends next. Votes are marked in the
+    database before the callback is executed, so that the callback runs
+    only once per vote, even after a restart or if the vote was added twice """
+
+    NAME = "deadlines"
+    FORMAT = "%Y-%m-%d %H:%M:%S"
+
+    def __init__(self, job_queue):
+        self._job_queue = job_queue
+        self._plugin = None
+        self._callback = None
+
+        # List of (end date, vote ID)
+        self._heap = list()
+        # IDs of all votes in heap
+        self._pending = set()
+        # Job for the next deadline
+        self._job = None
+        self._lock = Lock()
+
+    def start(self, plugin, callback):
+        """ Load votes whose result wasn't posted yet and execute callback
+        for them when they end. The callback gets 'bot' and the vote ID and
+        needs to return TRUE if the result was posted. 'plugin' is used
+        for database access """
+        self._plugin = plugin
+        self._callback = callback
+
+        sql = plugin.get_global_resource("select_pending_votes.sql")
+        res = plugin.execute_global_sql(sql)
+
+        if not res["success"]:
+            logging.error(f"Not possible to retrieve pending votes: {res['data']}")
+            return False
+
+        for vote_id, ending in res["data"]:
+            self.add(vote_id, ending)
+
+        # Votes might have been added before there was a callback
+        with self._lock:
+            self._schedule()
+
+        logging.info(f"{len(self._pending)} vote deadlines scheduled")
+        return True
+
+    def add(self, vote_id, ending):
+        """ Execute callback for given vote when it ends. 'ending' is
+        a local datetime or a string in the format of the database """
+        if not ending:
+            return
+
+        if isinstance(ending, str):
+            ending = datetime.strptime(ending, self.FORMAT)
+
+        with self._lock:
+            if vote_id in self._pending:
+                return
+
+            self._pending.add(vote_id)
+            heapq.heappush(self._heap, (ending, vote_id))
+
+            # Timer only needs to change if this vote ends first
+            if self._heap[0][1] == vote_id:
+                self._schedule()
+
+    def _schedule(self):
+        """ Replace job with one for the next deadline. Needs the lock """
+        if self._job:
+            self._job.schedule_removal()
+            self._job = None
+
+        if self._heap and self._callback:
+            self._job = self._job_queue.run_once(self._run, self._heap[0][0], name=self.NAME)
+
+    def _run(self, bot, job):
+        """ Callback for the JobQueue. Handles all votes that ended """
+        now = datetime.now()
+        ended = list()
+
+        with self._lock:
+            if job is self._job:
+                self._job = None
+
+            while self._heap and self._heap[0][0] <= now:
+                _, vote_id = heapq.heappop(self._heap)
+                self._pending.discard(vote_id)
+                ended.append(vote_id)
+
+            if not self._job:
+                self._schedule()
+
+        for vote_id in ended:
+            self._post(bot, vote_id)
+
+    def _mark(self, vote_id, posted):
+        """ Set marker of vote. Return FALSE if it already had
+        that value and None if the database couldn't be updated """
+        plg = self._plugin
+
+        try:
+            with plg.global_transaction() as cur:
+                cur.execute(
+                    plg.get_global_resource("update_results_posted.sql"),
+                    (int(posted), vote_id, int(not posted)))
+                return cur.rowcount > 0
+        except Exception as e:
+            logging.error(f"{repr(e)} - Vote {vote_id}: Can't mark result as {'' if posted else 'not '}posted")
+            return None
+
+    def _post(self, bot, vote_id):
+        marked = self._mark(vote_id, True)
+
+        # Will be tried again after next restart
+        if marked is None:
+            return
+
+        # Another instance or an earlier run might have posted it already
+        if not marked:
+            logging.info(f"Vote {vote_id}: Result already posted")
+            return
+
+        try:
+            posted = self._callback(bot, vote_id)
+        except Exception as e:
+            logging.error(f"{repr(e)} - Vote {vote_id}: Result not posted")
+            posted = False
+
+        # Will be tried again after next restart
+        if not posted:
+            self._mark(vote_id, False)
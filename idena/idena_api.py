@@ -1,79 +1,166 @@
+import time
+import asyncio
 import requests
 import logging
 
-from datetime import datetime
+from threading import Lock, Thread
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from idena.idena_api_async import AsyncIdenaAPI
 
 
 class IdenaAPI:
 
     base_url = "https://api.idena.io/api/"
     timeout = 3  # Seconds
-
-    def __init__(self, base_url=None, timeout=None):
+    workers = 10  # Max parallel identity lookups
+    pool_size = 10  # Max kept-alive connections
+    retries = 3  # Retries for failed requests
+    backoff = 0.3  # Backoff factor between retries
+    pages = 4  # Transaction pages to fetch in parallel
+    identity_ttl = 600  # Seconds, if next validation is unknown
+
+    def __init__(self, base_url=None, timeout=None, workers=None,
+                 pool_size=None, retries=None, backoff=None, pages=None):
         if base_url:
             self.base_url = base_url
         if timeout:
             self.timeout = timeout
+        if workers:
+            self.workers = workers
+        if pool_size:
+            self.pool_size = pool_size
+        if retries is not None:
+            self.retries = retries
+        if backoff is not None:
+            self.backoff = backoff
+        if pages:
+            self.pages = pages
+
+        # Keep connections alive and reuse them for all requests
+        self._session = requests.Session()
+        self._session.headers["Accept-Encoding"] = "gzip, deflate"
+
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=[429, 500, 502, 503, 504])
+
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry)
+
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        # Bulk requests run concurrently in their own event loop
+        self._aio = AsyncIdenaAPI(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            workers=self.workers,
+            pool_size=self.pool_size,
+            retries=self.retries,
+            backoff=self.backoff,
+            pages=self.pages)
+
+        self._loop = asyncio.new_event_loop()
+        Thread(target=self._loop.run_forever, daemon=True).start()
+
+        # Identity states: address -> verified (bool)
+        self._identities = dict()
+        self._identity_lock = Lock()
+        self._expires = 0
+
+        # Number of sent requests (without retries)
+        self._request_count = 0
+
+    @property
+    def request_count(self):
+        """ Return number of requests that were sent to the API so far """
+        return self._request_count + self._aio.request_count
 
     def _request(self, url, params, timeout=None):
         timeout = self.timeout if not timeout else timeout
+        self._request_count += 1
 
         try:
-            return requests.get(url, params=params, timeout=timeout).json()
+            return self._session.get(url, params=params, timeout=timeout).json()
         except Exception as e:
             return {"error": {"message": str(e), "code": 0}}
 
+    def _run(self, coro):
+        """ Execute coroutine in event loop and wait for the result """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def close(self):
+        """ Close all connections and stop the event loop """
+        self._run(self._aio.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._session.close()
+
     def transactions_for(self, address):
-        url = f"{self.base_url}address/{address}/txs"
-        transactions = list()
-        steps = 50
-        skip = 0
+        return self.new_transactions_for(address)["data"]
+
+    def new_transactions_for(self, address, last_hash=None):
+        """ Return transactions for address, newest first. If 'last_hash' is
+        given, paging stops at that transaction and only newer ones are returned.
+        'success' is FALSE if not all pages could be retrieved """
+        res = self._run(self._aio.new_transactions_for(address, last_hash=last_hash))
 
-        loop = True
-        while loop:
-            trx_list = self._request(url, {"skip": skip, "limit": steps})
+        logging.info(f"New tx for {address}: {len(res['data'])}")
+        return res
 
-            if "error" in trx_list:
-                logging.error(trx_list["error"]["message"])
-                return transactions
-            if not trx_list or not trx_list["result"]:
-                return transactions
+    def _identity_expiry(self):
+        """ Return UNIX timestamp until which cached identity states are valid.
+        States only change with a validation ceremony, so that's the next one """
+        now = time.time()
 
-            transactions.extend(trx_list["result"])
+        if self._expires > now:
+            return self._expires
 
-            if len(trx_list["result"]) < steps:
-                loop = False
+        epoch = self._request(f"{self.base_url}epoch/last", None)
+
+        try:
+            validation = epoch["result"]["validationTime"][:19]
+            validation = datetime.strptime(validation, "%Y-%m-%dT%H:%M:%S")
+            validation = validation.replace(tzinfo=timezone.utc).timestamp()
+        except Exception as e:
+            logging.debug(f"{repr(e)} - Can't get next validation: {epoch}")
+            validation = 0
 
-            skip += steps
+        # Ceremony could be running right now - check again soon
+        if validation <= now:
+            validation = now + self.identity_ttl
 
-        logging.info(f"All tx for {address}: {transactions}")
-        return transactions
+        self._expires = validation
+        return validation
 
-    def is_verified(self, address):
-        url = f"{self.base_url}identity/{address}"
-        identity = self._request(url, None)
+    def verify_many(self, addresses):
+        """ Return dict with verification state (TRUE or FALSE) for every given
+        address or None if its state couldn't be looked up. Cached states are used
+        until the next validation ceremony, all other addresses are looked up in parallel """
+        addresses = set(addresses)
 
-        if "result" in identity:
-            if "state" in identity["result"]:
-                if identity["result"]["state"] in ["Human", "Verified"]:
-                    return True
+        with self._identity_lock:
+            # Cached states are outdated once the validation they were looked up for passed
+            if time.time() > self._expires:
+                self._identities.clear()
+                self._identity_expiry()
 
-        return False
+            verified = {a: self._identities[a] for a in addresses if a in self._identities}
 
-    def valid_trx_for(self, address):
-        trans = self.transactions_for(address)
-        votes = dict()
+        missing = [a for a in addresses if a not in verified]
 
-        if not trans:
-            return votes
+        if missing:
+            states = self._run(self._aio.identity_states(missing))
 
-        for trx in trans:
-            if trx["type"] == "SendTx":
-                if self.is_verified(trx["from"]):
-                    dt = datetime.strptime(trx["timestamp"], "%Y-%m-%dT%H:%M:%SZ")
-                    votes[trx["from"]] = {"option": address, "timestamp": dt}
-                else:
-                    logging.info(f"Vote not counted. Not validated: {trx['from']} {trx}")
+            with self._identity_lock:
+                for address, state in zip(missing, states):
+                    if state is not None:
+                        self._identities[address] = state
+                    verified[address] = state
 
-        logging.info(f"Valid tx for {address}: {votes}")
-        return votes
+        logging.info(f"Identities: {len(addresses)} - looked up: {len(missing)}")
+        return verified
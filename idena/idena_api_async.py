@@ -0,0 +1,137 @@
+import asyncio
+import aiohttp
+import logging
+
+
+class AsyncIdenaAPI:
+
+    base_url = "https://api.idena.io/api/"
+    timeout = 3  # Seconds
+    workers = 10  # Max parallel identity lookups
+    pool_size = 10  # Max kept-alive connections
+    retries = 3  # Retries for failed requests
+    backoff = 0.3  # Backoff factor between retries
+    pages = 4  # Transaction pages to fetch in parallel
+
+    # Status codes for which a request will be retried
+    RETRY_STATUS = [429, 500, 502, 503, 504]
+
+    def __init__(self, base_url=None, timeout=None, workers=None,
+                 pool_size=None, retries=None, backoff=None, pages=None):
+        if base_url:
+            self.base_url = base_url
+        if timeout:
+            self.timeout = timeout
+        if workers:
+            self.workers = workers
+        if pool_size:
+            self.pool_size = pool_size
+        if retries is not None:
+            self.retries = retries
+        if backoff is not None:
+            self.backoff = backoff
+        if pages:
+            self.pages = pages
+
+        self._session = None
+
+        # Number of sent requests (including retries)
+        self.request_count = 0
+
+    def _get_session(self):
+        """ Return session with keep-alive connection pool. Needs
+        to be called from within the event loop that will use it """
+        if not self._session or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    async def _request(self, url, params=None):
+        session = self._get_session()
+        error = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff * (2 ** (attempt - 1)))
+
+            self.request_count += 1
+
+            try:
+                async with session.get(url, params=params) as resp:
+                    if resp.status in self.RETRY_STATUS:
+                        error = f"HTTP {resp.status} for {url}"
+                        continue
+
+                    return await resp.json(content_type=None)
+            except Exception as e:
+                error = str(e)
+
+        return {"error": {"message": error, "code": 0}}
+
+    async def new_transactions_for(self, address, last_hash=None):
+        """ Return transactions for address, newest first. If 'last_hash' is
+        given, paging stops at that transaction and only newer ones are returned.
+        After the first full page, next pages will be requested in parallel """
+        url = f"{self.base_url}address/{address}/txs"
+        res = {"success": True, "data": list()}
+        steps = 50
+        skip = 0
+        batch = 1
+
+        while True:
+            pages = await asyncio.gather(*[
+                self._request(url, {"skip": skip + i * steps, "limit": steps})
+                for i in range(batch)])
+
+            for trx_list in pages:
+                if "error" in trx_list:
+                    logging.error(trx_list["error"]["message"])
+                    res["success"] = False
+                    return res
+                if not trx_list or not trx_list["result"]:
+                    return res
+
+                for trx in trx_list["result"]:
+                    if last_hash and trx["hash"] == last_hash:
+                        return res
+                    res["data"].append(trx)
+
+                if len(trx_list["result"]) < steps:
+                    return res
+
+            skip += steps * batch
+            batch = self.pages
+
+    async def identity_state(self, address):
+        """ Return TRUE if identity is verified, FALSE if not
+        and None if it wasn't possible to retrieve the state """
+        url = f"{self.base_url}identity/{address}"
+        identity = await self._request(url)
+
+        if "error" in identity:
+            logging.error(f"Can't get identity {address}: {identity['error']['message']}")
+            return None
+
+        if "result" in identity:
+            if "state" in identity["result"]:
+                if identity["result"]["state"] in ["Human", "Verified"]:
+                    return True
+
+        return False
+
+    async def identity_states(self, addresses):
+        """ Return list with state of every given identity. Only
+        'workers' identities will be looked up at the same time """
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def _limited(address):
+            async with semaphore:
+                return await self.identity_state(address)
+
+        return await asyncio.gather(*[_limited(a) for a in addresses])
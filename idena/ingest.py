@@ -0,0 +1,68 @@
+import time
+import logging
+
+from collections import deque
+
+
+class Ingestor:
+    """ Periodically syncs the option addresses of all open votes so that
+    results can be counted from local data. Identities of new voters are
+    looked up too. A run sends at most 'budget' requests to the API and
+    the next run continues with the address where the last one stopped """
+
+    budget = 100  # Max API requests per run
+
+    def __init__(self, plugin, budget=None):
+        self._plugin = plugin
+
+        if budget:
+            self.budget = budget
+
+        # Addresses that still need to be synced in current round
+        self._queue = deque()
+
+    def _open_addresses(self):
+        """ Return addresses of all options of votes that didn't end yet """
+        plg = self._plugin
+
+        # Transactions that were sent in time can show up a bit later
+        plg.addresses.prune(time.time() - plg.tally.final_delay)
+
+        return plg.addresses.addresses()
+
+    def run(self, bot, job):
+        """ Callback for the JobQueue """
+        plg = self._plugin
+        api = plg.api
+
+        start = api.request_count
+        synced = 0
+
+        if not self._queue:
+            self._queue.extend(self._open_addresses())
+
+        while self._queue and api.request_count - start < self.budget:
+            res = plg.sync.sync(self._queue.popleft())
+
+            senders = set()
+
+            # Votes sent after the end don't count, no need to check identity
+            for trx in res["new"]:
+                if trx["type"] != "SendTx":
+                    continue
+
+                vote = plg.addresses.resolve(trx)
+
+                if vote and vote[2] and plg.tally.to_unix(trx["timestamp"]) > vote[2]:
+                    continue
+
+                senders.add(trx["from"])
+
+            if senders:
+                api.verify_many(senders)
+
+            synced += 1
+
+        logging.debug(
+            f"Ingested {synced} addresses with {api.request_count - start} "
+            f"requests - {len(self._queue)} left for next run")
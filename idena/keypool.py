@@ -0,0 +1,105 @@
+import logging
+import threading
+import idena.utils as utl
+
+
+class KeyPool:
+    """ Keeps generated keypairs for vote options in the global database so
+    that creating a vote doesn't need to wait for key generation. If less than
+    'low_water' keypairs are left, the pool will be filled up to 'size' again
+    in the background. Without database, keypairs are generated when needed """
+
+    size = 200  # Number of keypairs after refill
+    low_water = 50  # Refill if less keypairs are left
+    batch = 50  # Keypairs saved per transaction while refilling
+
+    def __init__(self, plugin, size=None, low_water=None):
+        self._plugin = plugin
+
+        if size:
+            self.size = size
+        if low_water is not None:
+            self.low_water = low_water
+
+        # Only one thread takes keypairs at a time so that they are never used twice
+        self._take_lock = threading.Lock()
+        self._refill_lock = threading.Lock()
+        self._refilling = False
+
+    def count(self):
+        """ Return number of available keypairs or None if unknown """
+        plg = self._plugin
+
+        sql = plg.get_global_resource("count_keypairs.sql")
+        res = plg.execute_global_sql(sql)
+
+        if not res["success"]:
+            return None
+
+        return res["data"][0][0]
+
+    def take(self, count):
+        """ Return list with 'count' keypairs as dicts with 'address' and
+        'privkey'. Returned keypairs are removed from the pool. If the pool
+        doesn't have enough of them, missing ones are generated directly """
+        plg = self._plugin
+        wallets = list()
+
+        if plg.global_config.get("database", "use_db"):
+            with self._take_lock:
+                try:
+                    with plg.global_transaction() as cur:
+                        rows = cur.execute(plg.get_global_resource("select_keypairs.sql"), (count,)).fetchall()
+                        cur.executemany(plg.get_global_resource("delete_keypair.sql"), [(r[0],) for r in rows])
+                    wallets = [{"address": a, "privkey": p} for a, p in rows]
+                except Exception as e:
+                    logging.error(f"{repr(e)} - Can't take keypairs from pool")
+
+            self.refill_async()
+
+        if len(wallets) < count:
+            logging.info(f"Key pool had {len(wallets)} of {count} keypairs - generating the rest")
+            wallets += [utl.generate_eth_wallet() for _ in range(count - len(wallets))]
+
+        return wallets
+
+    def refill_async(self, force=False):
+        """ Fill pool up to 'size' in a background thread if
+        less than 'low_water' keypairs (or if 'force' any less
+        than 'size') are left. Only one refill runs at a time """
+        with self._refill_lock:
+            if self._refilling:
+                return
+
+            self._refilling = True
+
+        threading.Thread(target=self._refill, args=(force,), daemon=True).start()
+
+    def _refill(self, force):
+        plg = self._plugin
+
+        try:
+            available = self.count()
+
+            if available is None:
+                return
+            if available >= (self.size if force else self.low_water):
+                return
+
+            missing = self.size - available
+            sql = plg.get_global_resource("insert_keypair.sql")
+
+            while missing > 0:
+                batch = [utl.generate_eth_wallet() for _ in range(min(self.batch, missing))]
+
+                with plg.global_transaction() as cur:
+                    cur.executemany(sql, [(w["address"], w["privkey"]) for w in batch])
+
+                missing -= len(batch)
+
+            logging.info(f"Key pool filled up to {self.size} keypairs")
+        except Exception as e:
+            logging.error(f"{repr(e)} - Can't fill key pool")
+        finally:
+            with self._refill_lock:
+                self._refilling = False
@@ -0,0 +1,239 @@
+import time
+import heapq
+import logging
+import threading
+
+from itertools import count
+from concurrent.futures import Future
+from telegram.error import RetryAfter
+
+
+class TokenBucket:
+    """ Allows 'rate' messages per second on average and
+    up to 'capacity' messages at once after a quiet time """
+
+    __slots__ = ["rate", "capacity", "tokens", "stamp"]
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait(self, now):
+        """ Return seconds until a message can be sent """
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def take(self, now):
+        self._refill(now)
+        self.tokens -= 1
+
+    def full(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class Outbox:
+    """ Sends all messages of the bot with a few threads while keeping
+    Telegram's flood limits: 'global_rate' messages per second in total,
+    'chat_rate' per second to a single user and 'group_rate' per minute
+    to a group. Messages with a higher priority are sent first, messages
+    of the same priority to the same chat keep their order. If Telegram
+    answers with 'RetryAfter', all sending pauses for the given time and
+    the message is sent again. Text messages that are allowed to be
+    merged are sent as one message if they wait for the same chat """
+
+    HIGH = 0  # Replies to commands
+    NORMAL = 1
+    LOW = 2  # Notifications for admins
+
+    MAX_TEXT = 4096  # Max length of a Telegram message
+
+    threads = 4  # Number of threads that send messages
+    global_rate = 25  # Messages per second in total
+    chat_rate = 1  # Messages per second to a single user
+    group_rate = 15  # Messages per minute to a group
+    burst = 5  # Max messages at once in total and to a group
+    chat_burst = 3  # Max messages at once to a single user
+    buckets = 1000  # Number of chats from which on idle limits are removed
+
+    def __init__(self, bot, threads=None, global_rate=None, chat_rate=None, group_rate=None):
+        self._bot = bot
+
+        if threads:
+            self.threads = threads
+        if global_rate:
+            self.global_rate = global_rate
+        if chat_rate:
+            self.chat_rate = chat_rate
+        if group_rate:
+            self.group_rate = group_rate
+
+        self._global = TokenBucket(self.global_rate, self.burst)
+        # Chat ID -> TokenBucket
+        self._buckets = dict()
+        # Chat ID -> heap with (priority, number, task)
+        self._chats = dict()
+        # Chats with a message that is being sent right now
+        self._busy = set()
+        # No message will be sent before this time
+        self._paused = 0.0
+
+        self._number = count()
+        self._cond = threading.Condition()
+        self._started = False
+
+    def send(self, chat_id, text, priority=NORMAL, merge=False, **kwargs):
+        """ Send text message. If 'merge' is TRUE, it might be sent together with
+        other waiting messages to the same chat that have 'merge' set and the same
+        keyword arguments. Return Future that has the sent message as result """
+        return self.submit(chat_id, "send_message", text, priority=priority, merge=merge, **kwargs)
+
+    def submit(self, chat_id, method, *args, priority=NORMAL, merge=False, **kwargs):
+        """ Call bot method with given name for given chat, for example
+        'send_photo'. Return Future that has the result of the method """
+        future = Future()
+        task = [method, chat_id, list(args), kwargs, merge, [future]]
+
+        with self._cond:
+            heapq.heappush(self._chats.setdefault(chat_id, list()), (priority, next(self._number), task))
+            self._cond.notify()
+
+            if not self._started:
+                self._started = True
+
+                for i in range(self.threads):
+                    threading.Thread(target=self._loop, name=f"outbox-{i}", daemon=True).start()
+
+        return future
+
+    def pending(self):
+        """ Return number of messages that weren't sent yet """
+        with self._cond:
+            return sum(len(heap) for heap in self._chats.values())
+
+    def _bucket(self, chat_id):
+        bucket = self._buckets.get(chat_id)
+
+        if not bucket:
+            if len(self._buckets) >= self.buckets:
+                self._prune()
+
+            # Groups and channels have negative IDs
+            if isinstance(chat_id, int) and chat_id < 0:
+                bucket = TokenBucket(self.group_rate / 60, self.burst)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+
+            self._buckets[chat_id] = bucket
+
+        return bucket
+
+    def _prune(self):
+        """ Remove limits of chats that could send a burst again """
+        now = time.monotonic()
+
+        for chat_id in [c for c, b in self._buckets.items() if b.full(now)]:
+            if chat_id not in self._chats:
+                del self._buckets[chat_id]
+
+    def _next(self):
+        """ Return next task that may be sent now and seconds to wait
+        if there is none. Needs the lock """
+        now = time.monotonic()
+
+        if now < self._paused:
+            return None, self._paused - now
+
+        wait = self._global.wait(now)
+
+        if wait:
+            return None, wait
+
+        best = None
+        wait = None
+
+        for chat_id, heap in self._chats.items():
+            if chat_id in self._busy:
+                continue
+
+            chat_wait = self._bucket(chat_id).wait(now)
+
+            if chat_wait:
+                wait = min(wait, chat_wait) if wait else chat_wait
+            elif best is None or heap[0][:2] < self._chats[best][0][:2]:
+                best = chat_id
+
+        if best is None:
+            return None, wait
+
+        heap = self._chats[best]
+        task = heapq.heappop(heap)[2]
+
+        # Waiting texts for the same chat are sent as one message
+        while task[4] and heap and self._mergeable(task, heap[0][2]):
+            other = heapq.heappop(heap)[2]
+            task[2][0] = f"{task[2][0]}\n\n{other[2][0]}"
+            task[5] += other[5]
+
+        if not heap:
+            del self._chats[best]
+
+        self._global.take(now)
+        self._bucket(best).take(now)
+        self._busy.add(best)
+
+        return task, None
+
+    def _mergeable(self, task, other):
+        return (other[4] and other[0] == task[0] == "send_message" and other[3] == task[3] and
+                len(task[2][0]) + len(other[2][0]) + 2 <= self.MAX_TEXT)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                task, wait = self._next()
+
+                if not task:
+                    self._cond.wait(wait)
+                    continue
+
+            try:
+                self._deliver(task)
+            finally:
+                with self._cond:
+                    self._busy.discard(task[1])
+                    self._cond.notify_all()
+
+    def _deliver(self, task):
+        method, chat_id, args, kwargs, _, futures = task
+
+        # Files might have been read partly by an earlier try
+        for arg in list(args) + list(kwargs.values()):
+            if hasattr(arg, "seek"):
+                arg.seek(0)
+
+        try:
+            result = getattr(self._bot, method)(chat_id, *args, **kwargs)
+        except RetryAfter as e:
+            logging.warning(f"Flood limit reached - sending paused for {e.retry_after} seconds")
+
+            with self._cond:
+                self._paused = max(self._paused, time.monotonic() + e.retry_after)
+                # Sent again first, before other messages to that chat
+                heapq.heappush(self._chats.setdefault(chat_id, list()), (-1, next(self._number), task))
+            return
+        except Exception as e:
+            logging.error(f"{repr(e)} - Can't execute '{method}' for chat {chat_id}")
+
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        for future in futures:
+            future.set_result(result)
@@ -1,13 +1,15 @@
 import os
-import sqlite3
 import logging
 import inspect
 import threading
 import idena.constants as c
 import idena.emoji as emo
 
-from .idena_api import IdenaAPI
-from pathlib import Path
+from .sync import TransactionSync
+from .tally import TallyEngine
+from .outbox import Outbox
+from .database import Database
+from contextlib import contextmanager
 from telegram import ChatAction, Chat
 from idena.config import ConfigManager
 
@@ -25,8 +27,38 @@ class IdenaPlugin:
         cfg_path = os.path.join(self.get_cfg_path(), f"{self.get_name()}.json")
         self.config = ConfigManager(cfg_path)
 
-        # Create access to IDENA API
-        self.api = IdenaAPI()
+        # Read resources of plugin again (it might have been updated)
+        for error in self._tgb.resources.load(self.get_res_path()):
+            logging.error(error)
+
+        # Create access to global database
+        self._global_db = Database.get(os.path.join(os.getcwd(), c.DIR_DAT, c.FILE_DAT))
+
+        # Create access to IDENA API (shared by all plugins)
+        self.api = self._tgb.api
+
+        # Create access to result charts (shared by all plugins)
+        self.charts = self._tgb.charts
+
+        # Create access to addresses of open votes (shared by all plugins)
+        self.addresses = self._tgb.addresses
+
+        # Create access to end of votes (shared by all plugins)
+        self.deadlines = self._tgb.deadlines
+
+        # Create access to rate limited sending (shared by all plugins)
+        self.outbox = self._tgb.outbox
+
+        # Create access to locally synced transactions
+        self.sync = TransactionSync(self)
+
+        # Create access to vote counting
+        self.tally = TallyEngine(
+            self,
+            cache=self._tgb.tally_cache,
+            final_delay=self.global_config.get("tally", "final_delay"),
+            vector_min=self.global_config.get("tally", "vector_min"),
+            ingest=bool(self.global_config.get("ingest", "interval")))
 
     def __enter__(self):
         """ This method gets executed before the plugin gets loaded.
@@ -110,11 +142,8 @@ class IdenaPlugin:
         """ Return the content of the given file
         from the global 'resource' directory """
 
-        path = os.path.join(os.getcwd(), c.DIR_RES, filename)
-
         try:
-            with open(path, "r", encoding="utf8") as f:
-                return f.read()
+            return self._tgb.resources.get(c.DIR_RES, filename)
         except Exception as e:
             logging.error(e)
             self.notify(e)
@@ -124,11 +153,8 @@ class IdenaPlugin:
     def get_resource(self, filename, plugin=""):
         """ Return the content of the given file from
         the 'resource' directory of the plugin """
-        path = os.path.join(self.get_res_path(plugin), filename)
-
         try:
-            with open(path, "r", encoding="utf8") as f:
-                return f.read()
+            return self._tgb.resources.get(self.get_res_path(plugin), filename)
         except Exception as e:
             logging.error(e)
             self.notify(e)
@@ -146,52 +172,37 @@ class IdenaPlugin:
             res["success"] = False
             return res
 
-        db_path = os.path.join(os.getcwd(), c.DIR_DAT, c.FILE_DAT)
-
-        try:
-            # Create directory if it doesn't exist
-            directory = os.path.dirname(db_path)
-            os.makedirs(directory, exist_ok=True)
-        except Exception as e:
-            res["data"] = str(e)
-            res["success"] = False
-            logging.error(e)
-            self.notify(e)
-
-        con = None
-
         try:
-            con = sqlite3.connect(db_path)
-            cur = con.cursor()
-            cur.execute(sql, args)
-            con.commit()
-
-            res["data"] = cur.fetchall()
+            res["data"] = self._global_db.execute(sql, *args)
             res["success"] = True
         except Exception as e:
             res["data"] = str(e)
             res["success"] = False
             logging.error(e)
             self.notify(e)
-        finally:
-            if con:
-                con.close()
-
-            return res
 
-    # TODO: Describe how arguments can be used
-    def execute_sql(self, sql, *args, plugin="", db_name=""):
-        """ Execute raw SQL statement on database for given
-        plugin and return the result if there is one """
+        return res
 
-        res = {"success": None, "data": None}
+    @contextmanager
+    def global_transaction(self):
+        """ Context manager that returns a cursor for the global database.
+        Everything will be committed at once at the end. If there is an
+        error, nothing will be written and the exception will be raised """
 
         # Check if database usage is enabled
         if not self.global_config.get("database", "use_db"):
-            res["data"] = "Database disabled"
-            res["success"] = False
-            return res
+            raise Exception("Database disabled")
+
+        try:
+            with self._global_db.transaction() as cur:
+                yield cur
+        except Exception as e:
+            logging.error(e)
+            self.notify(e)
+            raise
 
+    def _db_path(self, plugin="", db_name=""):
+        """ Return path to database file of given plugin """
         if db_name:
             if not db_name.lower().endswith(".db"):
                 db_name += ".db"
@@ -203,99 +214,58 @@ class IdenaPlugin:
 
         if plugin:
             plugin = plugin.lower()
-            data_path = self.get_dat_path(plugin=plugin)
-            db_path = os.path.join(data_path, db_name)
-        else:
-            db_path = os.path.join(self.get_dat_path(), db_name)
+            return os.path.join(self.get_dat_path(plugin=plugin), db_name)
 
-        try:
-            # Create directory if it doesn't exist
-            directory = os.path.dirname(db_path)
-            os.makedirs(directory, exist_ok=True)
-        except Exception as e:
-            res["data"] = str(e)
-            res["success"] = False
-            logging.error(e)
-            self.notify(e)
+        return os.path.join(self.get_dat_path(), db_name)
 
-        con = None
+    # TODO: Describe how arguments can be used
+    def execute_sql(self, sql, *args, plugin="", db_name=""):
+        """ Execute raw SQL statement on database for given
+        plugin and return the result if there is one """
 
-        try:
-            con = sqlite3.connect(db_path)
-            cur = con.cursor()
-            cur.execute(sql, args)
-            con.commit()
+        res = {"success": None, "data": None}
 
-            res["data"] = cur.fetchall()
+        # Check if database usage is enabled
+        if not self.global_config.get("database", "use_db"):
+            res["data"] = "Database disabled"
+            res["success"] = False
+            return res
+
+        try:
+            db = Database.get(self._db_path(plugin=plugin, db_name=db_name))
+            res["data"] = db.execute(sql, *args)
             res["success"] = True
         except Exception as e:
             res["data"] = str(e)
             res["success"] = False
             logging.error(e)
             self.notify(e)
-        finally:
-            if con:
-                con.close()
 
-            return res
+        return res
 
     def global_table_exists(self, table_name):
         """ Return TRUE if given table exists in global database, otherwise FALSE """
-        db_path = os.path.join(os.getcwd(), c.DIR_DAT, c.FILE_DAT)
-
-        if not Path(db_path).is_file():
-            return False
-
-        con = sqlite3.connect(db_path)
-        cur = con.cursor()
-        exists = False
-
-        statement = self.get_global_resource("table_exists.sql")
-
-        try:
-            if cur.execute(statement, [table_name]).fetchone():
-                exists = True
-        except Exception as e:
-            logging.error(e)
-            self.notify(e)
-
-        con.close()
-        return exists
+        return self._table_exists(self._global_db, table_name)
 
     def table_exists(self, table_name, plugin="", db_name=""):
         """ Return TRUE if given table exists, otherwise FALSE """
-        if db_name:
-            if not db_name.lower().endswith(".db"):
-                db_name += ".db"
-        else:
-            if plugin:
-                db_name = plugin + ".db"
-            else:
-                db_name = self.get_name() + ".db"
+        db = Database.get(self._db_path(plugin=plugin, db_name=db_name))
+        return self._table_exists(db, table_name)
 
-        if plugin:
-            db_path = os.path.join(self.get_dat_path(plugin=plugin), db_name)
-        else:
-            db_path = os.path.join(self.get_dat_path(), db_name)
-
-        if not Path(db_path).is_file():
+    def _table_exists(self, db, table_name):
+        if not db.exists():
             return False
 
-        con = sqlite3.connect(db_path)
-        cur = con.cursor()
-        exists = False
-
         statement = self.get_global_resource("table_exists.sql")
 
         try:
-            if cur.execute(statement, [table_name]).fetchone():
-                exists = True
+            if db.execute(statement, table_name):
+                return True
         except Exception as e:
             logging.error(e)
             self.notify(e)
 
-        con.close()
-        return exists
+        return False
 
     def get_name(self):
         """ Return the name of the current plugin """
@@ -338,22 +308,30 @@ class IdenaPlugin:
 
         if self.global_config.get("admin", "notify_on_error"):
             for admin in self.global_config.get("admin", "ids"):
-                try:
-                    msg = f"{emo.ALERT} Admin Notification:\n{some_input}"
-                    self._tgb.updater.bot.send_message(admin, msg)
-                except Exception as e:
-                    error = f"Not possible to notify admin id '{admin}'"
-                    logging.error(f"{error}: {e}")
+                msg = f"{emo.ALERT} Admin Notification:\n{some_input}"
+                self.outbox.send(admin, msg, priority=Outbox.LOW, merge=True)
         return some_input
 
     @staticmethod
     def threaded(fn):
-        """ Decorator for methods that have to run in their own thread """
-        def _threaded(*args, **kwargs):
-            thread = threading.Thread(target=fn, args=args, kwargs=kwargs)
-            thread.start()
+        """ Decorator for methods that have to run in the worker pool. Max number
+        of running commands of the plugin can be set with 'workers' in the plugin
+        config. If too many commands are waiting, the user will be asked to try later """
+        def _threaded(self, bot, update, **kwargs):
+            workers = self._tgb.workers
+
+            if workers.submit(self.get_name(), fn, self, bot, update, limit=self.config.get("workers"), **kwargs):
+                return
 
-            return thread
+            msg = f"{emo.WAIT} Bot is busy, please try again later"
+
+            try:
+                if update.callback_query:
+                    update.callback_query.answer(msg)
+                elif update.message:
+                    update.message.reply_text(msg)
+            except Exception as e:
+                logging.error(f"{e} - {update}")
         return _threaded
 
     @classmethod
@@ -399,15 +377,11 @@ class IdenaPlugin:
         def _owner(self, bot, update, **kwargs):
             user_id = update.effective_user.id
 
-            admins_global = self.global_config.get("admin", "ids")
-            if admins_global and isinstance(admins_global, list):
-                if user_id in admins_global:
-                    return func(self, bot, update, **kwargs)
+            if user_id in self.global_config.get_set("admin", "ids"):
+                return func(self, bot, update, **kwargs)
 
-            admins_plugin = self.config.get("admins")
-            if admins_plugin and isinstance(admins_plugin, list):
-                if user_id in admins_plugin:
-                    return func(self, bot, update, **kwargs)
+            if user_id in self.config.get_set("admins"):
+                return func(self, bot, update, **kwargs)
 
         return _owner
 
@@ -419,7 +393,7 @@ class IdenaPlugin:
         def _dependency(self, bot, update, **kwargs):
             dependencies = self.config.get("dependency")
 
-            if dependencies and isinstance(dependencies, list):
+            if dependencies and isinstance(dependencies, tuple):
                 plugins = [p.get_name() for p in self.get_plugins()]
 
                 for dependency in dependencies:
@@ -428,3 +402,46 @@ class IdenaPlugin:
 
             return func(self, bot, update, **kwargs)
         return _dependency
+
+
+class LazyPlugin:
+    """ Stands in for a plugin that has 'lazy' set to true in its config. Name,
+    handle, category and description are read from the config file, so the
+    plugin module only needs to be imported when its command is used first.
+    'loader' is a function that returns the real plugin for a plugin name """
+
+    def __init__(self, name, loader):
+        self._name = name
+        self._loader = loader
+        self._plugin = None
+        self._lock = threading.Lock()
+
+        cfg_path = os.path.join(c.DIR_SRC, c.DIR_PLG, name, c.DIR_CFG, f"{name}.json")
+        self.config = ConfigManager(cfg_path)
+
+    def load(self):
+        """ Import and create the real plugin if that didn't happen yet """
+        with self._lock:
+            if not self._plugin:
+                self._plugin = self._loader(self._name)
+                logging.info(f"Plugin '{self._name}' loaded on demand")
+
+            return self._plugin
+
+    def execute(self, bot, update, **kwargs):
+        return self.load().execute(bot, update, **kwargs)
+
+    def get_usage(self):
+        return self.load().get_usage()
+
+    def get_handle(self):
+        return self.config.get("handle")
+
+    def get_category(self):
+        return self.config.get("category")
+
+    def get_description(self):
+        return self.config.get("description")
+
+    def get_name(self):
+        return self._name
@@ -1,8 +1,6 @@
 import logging
 import idena.utils as utl
 
-from collections import OrderedDict
-from datetime import datetime
 from idena.plugin import IdenaPlugin
 from telegram import ParseMode, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import CallbackQueryHandler
@@ -13,8 +11,11 @@ class Start(IdenaPlugin):
     INTRO_FILE = "intro.md"
     CMD_VOTE = "vote"
 
+    # Callback data of 'Show Results' buttons is the vote ID (UUID as hex)
+    VOTE_PATTERN = "^[0-9a-f]{32}$"
+
     def __enter__(self):
-        self.add_handler(CallbackQueryHandler(self._callback), group=1)
+        self.add_handler(CallbackQueryHandler(self._callback, pattern=self.VOTE_PATTERN), group=1)
         return self
 
     @IdenaPlugin.threaded
@@ -78,64 +79,17 @@ class Start(IdenaPlugin):
         query = update.callback_query
         vote_id = query.data
 
-        sql = self.get_global_resource("select_vote.sql")
-        res = self.execute_global_sql(sql, vote_id)
+        result = self.tally.tally(vote_id)
 
-        if not res["success"]:
-            error = f"Not possible to retrieve vote data: {res['data']}"
+        if not result:
+            error = f"Not possible to retrieve vote data for {vote_id}"
             logging.error(error)
             self.notify(error)
             return
 
-        logging.info(f"Raw: {res['data']}")
-
-        result = {
-            "topic": None,
-            "ending": None,
-            "total_votes": None,
-            "options": OrderedDict()
-        }
-
-        vote_data = dict()
-        for op in res["data"]:
-            result["topic"] = op[2]
-            result["ending"] = op[7]
-            result["options"][op[4]] = list()
-
-            if result["ending"]:
-                dt = datetime.strptime(result["ending"], "%Y-%m-%d %H:%M:%S")
-
-            for key, value in self.api.valid_trx_for(op[4]).items():
-                if result["ending"]:
-                    if value["timestamp"] > dt:
-                        logging.info(f"Vote not counted. Too late: {key} {value}")
-                        continue
-
-                if key in vote_data:
-                    if value["timestamp"] < vote_data[key]["timestamp"]:
-                        logging.info(f"Vote not counted. New available: {key} {value}")
-                        continue
-
-                vote_data[key] = value
-
-        logging.info(f"Votes: {vote_data}")
-
-        total_votes = 0
-        for key, value in vote_data.items():
-            result["options"][value["option"]].append(key)
-            total_votes += 1
-
-        result["total_votes"] = total_votes
-
-        logging.info(f"Result: {result}")
-
-        option_nr = 0
         msg = str()
-        for op, votes in result["options"].items():
-            option_nr += 1
-            nr_of_votes = len(votes)
-
-            percent = 0 if nr_of_votes == 0 else (nr_of_votes / result["total_votes"] * 100)
+        for option_nr, nr_of_votes in enumerate(result.counts, 1):
+            percent = 0 if nr_of_votes == 0 else (nr_of_votes / result.total_votes * 100)
             done = '█' * int(percent / 6.666)
             progress = f"{done}"
 
@@ -146,6 +100,6 @@ class Start(IdenaPlugin):
 
             msg += f"\n{option_nr}) {progress}\n{percent}% (Votes: {nr_of_votes})"
 
-        msg = f"{msg}\n\nTotal Votes: {result['total_votes']}"
+        msg = f"{msg}\n\nTotal Votes: {result.total_votes}"
 
         bot.answer_callback_query(query.id, msg, show_alert=True)
@@ -1,18 +1,12 @@
 import re
+import time
 import uuid
-import logging
 import idena.emoji as emo
 import idena.utils as utl
-import plotly.express as px
-
-import io
-import pandas as pd
-import plotly.io as pio
 
 from enum import auto
-from io import BytesIO
-from datetime import datetime
-from collections import OrderedDict
+from idena.ingest import Ingestor
+from idena.keypool import KeyPool
 from idena.plugin import IdenaPlugin
 from telegram import ReplyKeyboardMarkup, KeyboardButton, ParseMode, ReplyKeyboardRemove, Chat
 from telegram.ext import RegexHandler, CommandHandler, ConversationHandler, MessageHandler, Filters
@@ -20,7 +14,6 @@ from telegram.ext import RegexHandler, CommandHandler, ConversationHandler, Mess
 
 # TODO: Restrict to 7 options
 # TODO: Restrict option to 100 chars
-# TODO: Add periodic job that checks if vote is over (every minute) and if yes, sends result to admins
 class Vote(IdenaPlugin):
 
     DATETIME_REGEX = r"^(\d{4}-\d{2}-\d{2}\s\d{2}:\d{2})+$"
@@ -34,13 +27,6 @@ class Vote(IdenaPlugin):
     FINISHED = "Finished"
 
     def __enter__(self):
-        if not self.global_table_exists("options"):
-            sql = self.get_global_resource("create_options.sql")
-            self.execute_global_sql(sql)
-        if not self.global_table_exists("votes"):
-            sql = self.get_global_resource("create_votes.sql")
-            self.execute_global_sql(sql)
-
         self.add_handler(
             ConversationHandler(
                 entry_points=[CommandHandler('vote', self.start)],
@@ -61,6 +47,23 @@ class Vote(IdenaPlugin):
                 allow_reentry=True),
             group=1)
 
+        # Find votes of transactions without database
+        self.addresses.load(self, time.time() - self.tally.final_delay)
+
+        # Addresses for options are generated in advance
+        self.keys = KeyPool(
+            self,
+            size=self.global_config.get("keypool", "size"),
+            low_water=self.global_config.get("keypool", "low_water"))
+        self.keys.refill_async(force=True)
+
+        # Keep transactions of open votes up to date in the background
+        interval = self.global_config.get("ingest", "interval")
+
+        if interval:
+            ingestor = Ingestor(self, budget=self.global_config.get("ingest", "budget"))
+            self.repeat_job(ingestor.run, interval)
+
         return self
 
     @IdenaPlugin.private
@@ -124,19 +127,22 @@ class Vote(IdenaPlugin):
         qst = user_data["question"]
         end = user_data["end"]
 
-        # Insert vote into database
-        sql = self.get_global_resource("insert_vote.sql")
-        self.execute_global_sql(sql, uid, usr, qst, end)
+        options = user_data["options"]
+        wallets = self.keys.take(len(options))
 
-        sql = self.get_global_resource("insert_option.sql")
+        rows = [(uid, o, w["address"], w["privkey"]) for o, w in zip(options, wallets)]
 
-        for option in user_data["options"]:
-            wallet = utl.generate_eth_wallet()
-            addr = wallet["address"]
-            priv = wallet["privkey"]
+        # Insert vote and its options into database
+        try:
+            with self.global_transaction() as cur:
+                cur.execute(self.get_global_resource("insert_vote.sql"), (uid, usr, qst, end))
+                cur.executemany(self.get_global_resource("insert_option.sql"), rows)
+        except Exception as e:
+            msg = f"{emo.ERROR} Not possible to save vote: {e}"
+            update.message.reply_text(msg, reply_markup=ReplyKeyboardRemove())
+            return ConversationHandler.END
 
-            # Insert vote options into database
-            self.execute_global_sql(sql, uid, option, addr, priv)
+        self.addresses.add(uid, end, [w["address"] for w in wallets])
 
         link = f"https://t.me/{bot.name[1:]}?startgroup={uid}"
         msg = f"{emo.CHECK} DONE! [Forward this vote to a group]({link})"
@@ -146,12 +152,8 @@ class Vote(IdenaPlugin):
             parse_mode=ParseMode.MARKDOWN,
             reply_markup=ReplyKeyboardRemove())
 
-        if end:
-            end = datetime.strptime(end, "%Y-%m-%d %H:%M:%S")
-            now = datetime.now()
-
-            if end and now < end:
-                self.repeat_job(self._post_results, 0, first=end, context=uid)
+        # Result will be sent to admins when vote ends
+        self.deadlines.add(uid, end)
 
         return ConversationHandler.END
 
@@ -177,96 +179,6 @@ class Vote(IdenaPlugin):
         menu = utl.build_menu(buttons, n_cols=2)
         return ReplyKeyboardMarkup(menu, resize_keyboard=True)
 
-    def _post_results(self, bot, job):
-        job.schedule_removal()
-        vote_id = job.context
-
-        sql = self.get_global_resource("select_vote.sql")
-        res = self.execute_global_sql(sql, vote_id)
-
-        if not res["success"]:
-            msg = f"{emo.ERROR} Error reading vote"
-            self.notify(f"{msg} {vote_id}")
-            return
-
-        result = {
-            "topic": None,
-            "ending": None,
-            "total_votes": None,
-            "options": OrderedDict()
-        }
-
-        vote_data = dict()
-        for op in res["data"]:
-            result["topic"] = op[2]
-            result["ending"] = op[7]
-            result["options"][op[4]] = list()
-
-            if result["ending"]:
-                dt = datetime.strptime(result["ending"], "%Y-%m-%d %H:%M:%S")
-
-            for key, value in self.api.valid_trx_for(op[4]).items():
-                if result["ending"]:
-                    if value["timestamp"] > dt:
-                        logging.info(f"Vote not counted. Too late: {key} {value}")
-                        continue
-
-                if key in vote_data:
-                    if value["timestamp"] < vote_data[key]["timestamp"]:
-                        logging.info(f"Vote not counted. New available: {key} {value}")
-                        continue
-
-                vote_data[key] = value
-
-        logging.info(f"Votes: {vote_data}")
-
-        total_votes = 0
-        for key, value in vote_data.items():
-            result["options"][value["option"]].append(key)
-            total_votes += 1
-
-        result["total_votes"] = total_votes
-
-        logging.info(f"Result: {result}")
-
-        data = {
-            "Options": [],
-            "Votes": []
-        }
-
-        count = 0
-        for op, op_data in result["options"].items():
-            op_str = res["data"][count][3]
-            data["Options"].append(op_str)
-
-            data["Votes"].append(len(op_data))
-            count += 1
-
-        fig = px.bar(
-            pd.DataFrame(data=data),
-            x="Options",
-            y="Votes",
-            title=result["topic"])
-
-        """
-        fig.update_yaxes(
-            tickformat=',d'
-        )
-        """
-
-        if self.global_config.get("admin", "notify_on_error"):
-            for admin in self.global_config.get("admin", "ids"):
-                try:
-                    bot.send_photo(
-                        admin,
-                        photo=io.BufferedReader(BytesIO(pio.to_image(fig, format="jpeg"))))
-                    bot.send_message(
-                        admin,
-                        str(vote_data) if vote_data else "No votes")
-                except Exception as e:
-                    error = f"Not possible to notify admin id '{admin}' about ended vote"
-                    logging.error(f"{error}: {e}")
-
     def execute(self, bot, update, args):
         # We don't need this method since we already have a ConversationHandler
         pass
@@ -0,0 +1,168 @@
+import sys
+import time
+import builtins
+import platform
+
+from threading import Lock, get_ident
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class StartupProfiler:
+    """ Records how long the phases of the startup, the loading of every plugin
+    and the import of every module take. Does nothing until it gets enabled.
+    Imports are timed by wrapping '__import__', so modules that are loaded
+    with 'importlib' only show up in the phase or plugin that loads them.
+    Use 'StartupProfiler.get()' so that all parts of the bot use the same one """
+
+    imports = 25  # Number of slowest modules in report
+
+    _instance = None
+    _instance_lock = Lock()
+
+    def __init__(self):
+        self.enabled = False
+
+        self._start = time.perf_counter()
+        self._end = None
+        # List of [name, seconds, depth]
+        self._phases = list()
+        self._depth = 0
+        # Plugin name -> seconds
+        self._plugins = dict()
+        # Module name -> own import time in seconds (without nested imports)
+        self._imports = dict()
+        # Time of nested imports for every import that is running
+        self._import_stack = list()
+        self._import = None
+
+    @classmethod
+    def get(cls):
+        """ Return profiler of the process """
+        with cls._instance_lock:
+            if not cls._instance:
+                cls._instance = cls()
+
+            return cls._instance
+
+    def enable(self):
+        """ Start profiling. Imports will be timed from now on """
+        if self.enabled:
+            return
+
+        self.enabled = True
+        self._start = time.perf_counter()
+
+        self._import = builtins.__import__
+        thread = get_ident()
+
+        def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            args = (name, globals, locals, fromlist, level)
+
+            if level and globals:
+                name = f"{globals.get('__package__') or ''}.{name}".strip(".")
+
+            if name in sys.modules or get_ident() != thread:
+                return self._import(*args)
+
+            self._import_stack.append(0.0)
+            start = time.perf_counter()
+
+            try:
+                return self._import(*args)
+            finally:
+                took = time.perf_counter() - start
+                nested = self._import_stack.pop()
+
+                self._imports[name] = self._imports.get(name, 0.0) + took - nested
+
+                if self._import_stack:
+                    self._import_stack[-1] += took
+
+        builtins.__import__ = _timed_import
+
+    @contextmanager
+    def phase(self, name):
+        """ Context manager that records how long its block takes """
+        if not self.enabled:
+            yield
+            return
+
+        entry = [name, 0.0, self._depth]
+        self._phases.append(entry)
+        self._depth += 1
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            entry[1] = time.perf_counter() - start
+            self._depth -= 1
+
+    def plugin(self, name, seconds):
+        """ Record how long loading of given plugin took """
+        if self.enabled:
+            self._plugins[name] = seconds
+
+    @staticmethod
+    def peak_rss():
+        """ Return max memory usage of the process in MB or None if unknown """
+        try:
+            import resource
+
+            # Bytes on macOS, kB everywhere else
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+        except ImportError:
+            pass
+
+        try:
+            import psutil
+
+            info = psutil.Process().memory_info()
+            return getattr(info, "peak_wset", info.rss) / 1024 / 1024
+        except Exception:
+            return None
+
+    def finish(self):
+        """ Stop timing imports and return the report as dict """
+        if self._import:
+            builtins.__import__ = self._import
+            self._import = None
+
+        if self._end is None:
+            self._end = time.perf_counter()
+
+        slowest = sorted(self._imports.items(), key=lambda i: i[1], reverse=True)
+        rss = self.peak_rss()
+
+        return {
+            "created": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "total": round(self._end - self._start, 4),
+            "peak_rss_mb": round(rss, 1) if rss else None,
+            "phases": [{"name": n, "seconds": round(s, 4), "depth": d} for n, s, d in self._phases],
+            "plugins": {n: round(s, 4) for n, s in self._plugins.items()},
+            "imports": {n: round(s, 4) for n, s in slowest[:self.imports]},
+            "modules": len(sys.modules)
+        }
+
+    @staticmethod
+    def summary(report):
+        """ Return short text version of given report """
+        lines = [f"Startup took {report['total']:.2f}s - Peak RSS {report['peak_rss_mb']} MB"]
+
+        for phase in report["phases"]:
+            lines.append(f"{'  ' * (phase['depth'] + 1)}{phase['name']}: {phase['seconds']:.3f}s")
+
+        slow = sorted(report["plugins"].items(), key=lambda p: p[1], reverse=True)[:5]
+        if slow:
+            lines.append("Slowest plugins:")
+            lines.extend(f"  {name}: {seconds:.3f}s" for name, seconds in slow)
+
+        slow = list(report["imports"].items())[:5]
+        if slow:
+            lines.append("Slowest imports:")
+            lines.extend(f"  {name}: {seconds:.3f}s" for name, seconds in slow)
+
+        return "\n".join(lines)
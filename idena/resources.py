@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import logging
+
+from threading import Lock
+from idena.watcher import FileWatcher
+
+
+class ResourceCache:
+    """ Keeps the content of resource files (SQL statements, markdown) in
+    memory so that they don't need to be read from disk for every request.
+    Loaded directories are watched and a file will be read again after it
+    was changed. Loading a directory again replaces all of its files """
+
+    def __init__(self):
+        # Directory -> {file name -> content}
+        self._files = dict()
+        # Absolute path of watched directory -> directory as given to 'load'
+        self._watched = dict()
+        self._lock = Lock()
+
+    def load(self, directory):
+        """ Read all files of given directory and watch it for changes.
+        Return list with problems of files that couldn't be loaded """
+        files = dict()
+        errors = list()
+
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                path = os.path.join(directory, name)
+
+                if not os.path.isfile(path):
+                    continue
+
+                try:
+                    with open(path, "r", encoding="utf8") as f:
+                        content = f.read()
+                except Exception as e:
+                    errors.append(f"Can't read '{path}': {e}")
+                    continue
+
+                if name.endswith(".sql") and not self.complete(content):
+                    errors.append(f"Incomplete SQL statement in '{path}'")
+
+                files[name] = content
+
+        with self._lock:
+            self._files[directory] = files
+
+        self._watch(directory)
+        return errors
+
+    def files(self, directory):
+        """ Return dict with file name as key and content as value
+        for all loaded files of given directory """
+        with self._lock:
+            return dict(self._files.get(directory, dict()))
+
+    def get(self, directory, filename):
+        """ Return content of given file. Will be read from disk only
+        if it wasn't loaded yet or changed since it was loaded """
+        with self._lock:
+            files = self._files.get(directory)
+
+            if files is not None and filename in files:
+                return files[filename]
+
+        if files is None:
+            self.load(directory)
+
+        with open(os.path.join(directory, filename), "r", encoding="utf8") as f:
+            content = f.read()
+
+        with self._lock:
+            self._files.setdefault(directory, dict())[filename] = content
+
+        return content
+
+    @staticmethod
+    def complete(sql):
+        """ Return TRUE if given text is a complete SQL statement """
+        sql = sql.strip().rstrip(";")
+        return bool(sql) and sqlite3.complete_statement(f"{sql};")
+
+    def _watch(self, directory):
+        if not os.path.isdir(directory):
+            return
+
+        path = os.path.abspath(directory)
+
+        with self._lock:
+            if path in self._watched:
+                return
+
+            self._watched[path] = directory
+
+        FileWatcher.get().watch_dir(path, self._changed)
+
+    def _changed(self, path):
+        """ Forget file that changed so that it will be read again """
+        with self._lock:
+            directory = self._watched.get(os.path.dirname(path))
+
+            if directory in self._files:
+                if self._files[directory].pop(os.path.basename(path), None) is not None:
+                    logging.debug(f"Resource '{path}' changed")
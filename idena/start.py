@@ -5,6 +5,8 @@ import idena.constants as con
 
 from argparse import ArgumentParser
 from idena.tgbot import TelegramBot
+from idena.outbox import Outbox
+from idena.profiler import StartupProfiler
 from idena.config import ConfigManager as Cfg
 from logging.handlers import TimedRotatingFileHandler
 
@@ -14,15 +16,27 @@ from logging.handlers import TimedRotatingFileHandler
 class Idena:
 
     def __init__(self):
+        profiler = StartupProfiler.get()
+
         # Parse command line arguments
-        self.args = self._parse_args()
+        with profiler.phase("Arguments"):
+            self.args = self._parse_args()
 
         # Set up logging
-        self._init_logger()
+        with profiler.phase("Logging"):
+            self._init_logger()
 
         # Read global config file and create Telegram bot
-        self.cfg = Cfg(os.path.join(con.DIR_CFG, con.FILE_CFG))
-        self.tgb = TelegramBot(self.cfg, self._get_bot_token())
+        with profiler.phase("Config"):
+            self.cfg = Cfg(os.path.join(con.DIR_CFG, con.FILE_CFG))
+
+        token = self._get_bot_token()
+
+        with profiler.phase("Telegram bot"):
+            self.tgb = TelegramBot(self.cfg, token)
+
+        if self.args.profile_startup:
+            self._save_profile(profiler.finish())
 
     def _parse_args(self):
         """ Parse command line arguments """
@@ -73,6 +87,15 @@ class Idena:
             required=False,
             default=False)
 
+        # Startup profiling
+        parser.add_argument(
+            "--profile-startup",
+            dest="profile_startup",
+            action="store_true",
+            help="save timings of startup and send them to admins",
+            required=False,
+            default=False)
+
         return parser.parse_args()
 
     # Configure logging
@@ -115,6 +138,23 @@ class Idena:
                 logr = logging.getLogger(module)
                 logr.setLevel(int(loglvl))
 
+    def _save_profile(self, report):
+        """ Save startup profile as JSON and send summary to admins """
+        path = os.path.join(con.DIR_DAT, con.FILE_PRF)
+
+        try:
+            os.makedirs(con.DIR_DAT, exist_ok=True)
+            with open(path, "w", encoding="utf8") as file:
+                json.dump(report, file, indent=4)
+        except Exception as e:
+            logging.error(f"{repr(e)} - Can't save startup profile to '{path}'")
+
+        summary = StartupProfiler.summary(report)
+        logging.info(summary)
+
+        for admin in self.cfg.get("admin", "ids") or []:
+            self.tgb.outbox.send(admin, summary, priority=Outbox.LOW)
+
     # Read bot token from file
     def _get_bot_token(self):
         """ Read Telegram bot token from config file or command line or input """
@@ -0,0 +1,119 @@
+import logging
+
+
+class TransactionSync:
+    """ Keeps a local copy of all transactions of vote option addresses
+    in the global database. For every address the newest known transaction
+    is saved so that syncing only needs to download newer transactions """
+
+    def __init__(self, plugin):
+        self._plugin = plugin
+
+    def sync(self, address):
+        """ Download new transactions for the given address and save them.
+        'success' is TRUE if the local data is up to date, 'data' holds the
+        hash of the newest known transaction (None if there is none) and
+        'new' the list of transactions that were added """
+        plg = self._plugin
+        res = {"success": False, "data": None, "new": list()}
+
+        sql = plg.get_global_resource("select_sync.sql")
+        cursor = plg.execute_global_sql(sql, address)
+
+        if not cursor["success"]:
+            return res
+
+        last_hash = cursor["data"][0][0] if cursor["data"] else None
+        res["data"] = last_hash
+
+        new = plg.api.new_transactions_for(address, last_hash=last_hash)
+
+        # Keep old cursor so that missing transactions will be retrieved next time
+        if not new["success"]:
+            logging.warning(f"Sync for {address} not complete")
+            return res
+        if not new["data"]:
+            res["success"] = True
+            return res
+
+        newest = new["data"][0]
+
+        # Oldest first so that 'rowid' keeps order of transactions
+        rows = [(t["hash"], address, t["from"], t["type"], t["timestamp"]) for t in reversed(new["data"])]
+
+        try:
+            with plg.global_transaction() as cur:
+                cur.executemany(plg.get_global_resource("insert_transaction.sql"), rows)
+                cur.execute(
+                    plg.get_global_resource("update_sync.sql"),
+                    (address, newest["hash"], newest["timestamp"]))
+        except Exception:
+            return res
+
+        res["success"] = True
+        res["data"] = newest["hash"]
+        res["new"] = new["data"]
+
+        logging.info(f"Synced {len(new['data'])} new tx for {address}")
+        return res
+
+    def sync_all(self, addresses):
+        """ Sync all given addresses. 'data' is a tuple with the hash of the
+        newest transaction for every address and 'success' is TRUE if all
+        addresses are up to date. Without database there is nothing to sync """
+        res = {"success": False, "data": None}
+
+        if not self._plugin.global_config.get("database", "use_db"):
+            return res
+
+        synced = [self.sync(address) for address in addresses]
+
+        res["success"] = all(s["success"] for s in synced)
+        res["data"] = tuple(s["data"] for s in synced)
+        return res
+
+    def cursors(self, addresses):
+        """ Return tuple with the hash of the newest saved transaction for every
+        given address, like sync_all() does, but without syncing anything """
+        plg = self._plugin
+        sql = plg.get_global_resource("select_sync.sql")
+        cursors = list()
+
+        for address in addresses:
+            res = plg.execute_global_sql(sql, address)
+
+            if not res["success"]:
+                return None
+
+            cursors.append(res["data"][0][0] if res["data"] else None)
+
+        return tuple(cursors)
+
+    def transactions_for(self, address):
+        """ Sync given address and return all its transactions, newest
+        first, in the same format that the IDENA API is using """
+        plg = self._plugin
+
+        # Without database there is no way to remember anything
+        if not plg.global_config.get("database", "use_db"):
+            return plg.api.transactions_for(address)
+
+        self.sync(address)
+        return self.local_transactions_for(address)
+
+    def local_transactions_for(self, address):
+        """ Return all saved transactions for given address, newest first,
+        in the same format that the IDENA API is using """
+        plg = self._plugin
+
+        sql = plg.get_global_resource("select_transactions.sql")
+        res = plg.execute_global_sql(sql, address)
+
+        if not res["success"]:
+            return list()
+
+        return [{"hash": h, "from": s, "type": t, "timestamp": ts} for h, s, t, ts in res["data"]]
+
+    def transactions_for_all(self, addresses):
+        """ Return dict with address as key and its transactions as value """
+        return {address: self.transactions_for(address) for address in addresses}
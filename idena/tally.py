@@ -0,0 +1,462 @@
+import time
+import logging
+
+from operator import itemgetter
+from itertools import compress
+from threading import Lock
+from weakref import WeakValueDictionary
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+class TallyResult:
+    """ Result of a vote. Options are ordered as they were created and
+    all timestamps are UNIX timestamps (seconds, UTC) as integers """
+
+    __slots__ = [
+        "vote_id",
+        "question",
+        "created",
+        "ending",
+        "options",
+        "addresses",
+        "counts",
+        "voters",
+        "timestamps",
+        "failed"]
+
+    def __init__(self, vote_id, question, created, ending, options, addresses):
+        self.vote_id = vote_id
+        self.question = question
+        self.created = created
+        self.ending = ending
+        self.options = options
+        self.addresses = addresses
+
+        # Number of votes per option
+        self.counts = [0] * len(options)
+        # Voter address -> index of option
+        self.voters = dict()
+        # Voter address -> time of vote
+        self.timestamps = dict()
+        # Number of voters whose identity couldn't be looked up
+        self.failed = 0
+
+    @property
+    def total_votes(self):
+        return len(self.voters)
+
+
+class TallyCache:
+    """ Keeps the latest TallyResult of votes. A result stays valid as long
+    as there are no new transactions for any of the options of the vote """
+
+    max_age = 30  # Seconds until a result needs to be checked again
+    size = 100  # Max number of cached votes
+
+    def __init__(self, max_age=None, size=None):
+        if max_age is not None:
+            self.max_age = max_age
+        if size:
+            self.size = size
+
+        # Vote ID -> [version, last check, result]
+        self._entries = OrderedDict()
+        # Locks are removed as soon as nobody uses them anymore
+        self._locks = WeakValueDictionary()
+        self._lock = Lock()
+
+    def lock(self, vote_id):
+        """ Return lock for given vote so that it's only counted once at a time """
+        with self._lock:
+            return self._locks.setdefault(vote_id, Lock())
+
+    def get(self, vote_id, version=None):
+        """ Return cached result if it was checked within the last 'max_age'
+        seconds or, if 'version' is given, if it was counted for that version """
+        with self._lock:
+            entry = self._entries.get(vote_id)
+
+            if not entry:
+                return None
+
+            if version is None:
+                if time.time() - entry[1] > self.max_age:
+                    return None
+            elif version == entry[0]:
+                entry[1] = time.time()
+            else:
+                return None
+
+            self._entries.move_to_end(vote_id)
+            return entry[2]
+
+    def put(self, vote_id, version, result):
+        """ Save result that was counted for given version """
+        with self._lock:
+            self._entries[vote_id] = [version, time.time(), result]
+            self._entries.move_to_end(vote_id)
+
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def remove(self, vote_id):
+        """ Remove cached result for given vote """
+        with self._lock:
+            self._entries.pop(vote_id, None)
+
+
+class TallyEngine:
+    """ Counts the votes for a vote. Every verified identity has one vote.
+    If an identity sends to more than one option, the latest transaction that
+    was sent before the vote ended counts. The end is the local time that the
+    creator of the vote entered. On equal timestamps the later option wins.
+    Some time after a vote ended, its result will be saved and won't be
+    counted again. With 'ingest', transactions of open votes are expected
+    to be synced in the background and are only read locally """
+
+    final_delay = 120  # Seconds after end of vote until result is final
+    vector_min = 20000  # Transactions from which on VectorTally is used
+
+    # Cache version for results that can't change anymore
+    FINAL = "final"
+    # Cache version for results that need to be counted again
+    INCOMPLETE = "incomplete"
+
+    def __init__(self, plugin, cache=None, final_delay=None, ingest=False, vector_min=None):
+        self._plugin = plugin
+        self._cache = cache if cache else TallyCache()
+        self._ingest = ingest
+
+        if final_delay is not None:
+            self.final_delay = final_delay
+        if vector_min is not None:
+            self.vector_min = vector_min
+
+    @staticmethod
+    def to_unix(text):
+        """ Convert UTC timestamp from database or IDENA API to UNIX timestamp """
+        if not text:
+            return None
+
+        dt = datetime.fromisoformat(text[:19])
+        return int(dt.replace(tzinfo=timezone.utc).timestamp())
+
+    @staticmethod
+    def local_to_unix(text):
+        """ Convert end of vote from database to UNIX timestamp. It's
+        saved as the local time that the creator of the vote entered """
+        if not text:
+            return None
+
+        return int(datetime.fromisoformat(text[:19]).timestamp())
+
+    def load(self, vote_id):
+        """ Return empty TallyResult with vote data from
+        database or None if vote can't be retrieved """
+        plg = self._plugin
+
+        sql = plg.get_global_resource("select_vote.sql")
+        res = plg.execute_global_sql(sql, vote_id)
+
+        if not res["success"] or not res["data"]:
+            logging.error(f"Not possible to retrieve vote {vote_id}: {res['data']}")
+            return None
+
+        rows = [row for row in res["data"] if row[4]]
+        first = res["data"][0]
+
+        return TallyResult(
+            first[0],
+            first[2],
+            self.to_unix(first[6]),
+            self.local_to_unix(first[7]),
+            [row[3] for row in rows],
+            [row[4] for row in rows])
+
+    def tally(self, vote_id):
+        """ Return TallyResult for given vote or None if it can't be retrieved.
+        Results are cached and shared between callers - don't change them """
+        cache = self._cache
+        sync = self._plugin.sync
+
+        result = cache.get(vote_id)
+
+        if result:
+            return result
+
+        with cache.lock(vote_id):
+            # Might have been counted while waiting for the lock
+            result = cache.get(vote_id)
+
+            if result:
+                return result
+
+            result = self.load(vote_id)
+
+            if not result:
+                return None
+
+            if self.load_final(result):
+                cache.put(vote_id, self.FINAL, result)
+                return result
+
+            # Newest transaction of every option identifies the result
+            if self._ingest and not self.is_final(result):
+                synced = {"success": False, "data": sync.cursors(result.addresses)}
+            else:
+                synced = sync.sync_all(result.addresses)
+            version = synced["data"]
+            cached = cache.get(vote_id, version=version)
+
+            if cached:
+                return cached
+
+            # Without database all transactions come from the API
+            if version is None:
+                transactions = sync.transactions_for_all(result.addresses)
+            else:
+                transactions = {a: sync.local_transactions_for(a) for a in result.addresses}
+
+            self.count(result, transactions)
+
+            # Freeze result only if all transactions and identities are known
+            if synced["success"] and not result.failed and self.is_final(result):
+                self.save_final(result)
+
+            # Failed lookups are tried again as soon as the result is outdated
+            cache.put(vote_id, self.INCOMPLETE if result.failed else version, result)
+
+        return result
+
+    def is_final(self, result):
+        """ Return TRUE if vote ended long enough ago that all
+        transactions that were sent in time are available """
+        if not result.ending:
+            return False
+
+        return time.time() > result.ending + self.final_delay
+
+    def load_final(self, result):
+        """ Fill given empty TallyResult with the saved final
+        result. Return FALSE if the vote isn't final yet """
+        if not self.is_final(result):
+            return False
+
+        plg = self._plugin
+
+        sql = plg.get_global_resource("select_results.sql")
+        res = plg.execute_global_sql(sql, result.vote_id)
+
+        if not res["success"] or not res["data"]:
+            return False
+
+        for option, votes in res["data"]:
+            result.counts[option] = votes
+
+        sql = plg.get_global_resource("select_voters.sql")
+        res = plg.execute_global_sql(sql, result.vote_id)
+
+        if not res["success"]:
+            return False
+
+        for voter, option, timestamp in res["data"]:
+            result.voters[voter] = option
+            result.timestamps[voter] = timestamp
+
+        return True
+
+    def save_final(self, result):
+        """ Save result of ended vote so that it doesn't need to be counted again """
+        plg = self._plugin
+
+        voters = [(result.vote_id, v, o, result.timestamps[v]) for v, o in result.voters.items()]
+        counts = [(result.vote_id, o, votes) for o, votes in enumerate(result.counts)]
+
+        try:
+            with plg.global_transaction() as cur:
+                cur.executemany(plg.get_global_resource("insert_voter.sql"), voters)
+                cur.executemany(plg.get_global_resource("insert_result.sql"), counts)
+        except Exception:
+            return False
+
+        logging.info(f"Vote {result.vote_id}: Final result saved")
+        return True
+
+    def count(self, result, transactions):
+        """ Count votes in one pass over all transactions. Dict 'transactions'
+        has option address as key and list of its transactions as value.
+        Large votes are counted with VectorTally if NumPy is available """
+        if sum(len(t) for t in transactions.values()) >= self.vector_min:
+            try:
+                counted = VectorTally(self._plugin).count(result, transactions)
+
+                if counted:
+                    return counted
+            except ImportError:
+                pass
+
+        to_unix = self.to_unix
+        ending = result.ending
+
+        # Voter address -> (timestamp, option index)
+        latest = dict()
+        too_late = 0
+
+        for option, address in enumerate(result.addresses):
+            for trx in transactions.get(address, []):
+                if trx["type"] != "SendTx":
+                    continue
+
+                timestamp = to_unix(trx["timestamp"])
+
+                if ending and timestamp > ending:
+                    too_late += 1
+                    continue
+
+                voter = trx["from"]
+                vote = latest.get(voter)
+
+                if vote is None or timestamp >= vote[0]:
+                    latest[voter] = (timestamp, option)
+
+        # Identities need to be checked only for votes that would count
+        verified = self._plugin.api.verify_many(latest)
+
+        for voter, (timestamp, option) in latest.items():
+            if not verified[voter]:
+                if verified[voter] is None:
+                    result.failed += 1
+                continue
+
+            result.voters[voter] = option
+            result.timestamps[voter] = timestamp
+            result.counts[option] += 1
+
+        logging.info(
+            f"Vote {result.vote_id}: {result.total_votes} votes - "
+            f"{len(latest) - result.total_votes} not verified - "
+            f"{result.failed} lookups failed - "
+            f"{too_late} too late")
+
+        logging.debug(f"Vote {result.vote_id}: {result.counts}")
+        return result
+
+
+class VectorTally:
+    """ Counts votes with the same rules as TallyEngine.count() but with
+    NumPy arrays, for votes with a lot of transactions. Voter addresses are
+    hashed to integers, transactions are sorted by these hashes and the latest
+    vote of every voter is the maximum of timestamp and option within its
+    group. Raises ImportError if NumPy isn't installed """
+
+    def __init__(self, plugin):
+        import numpy
+
+        self._np = numpy
+        self._plugin = plugin
+
+    def to_unix(self, texts):
+        """ Convert list of timestamps from database or IDENA
+        API to array of UNIX timestamps as 64 bit integers """
+        np = self._np
+        return np.array(texts, dtype="S19").astype("datetime64[s]").astype(np.int64)
+
+    def to_keys(self, texts):
+        """ Return 2D array with the bytes of every given string as
+        unsigned integers. Equal rows belong to equal strings """
+        np = self._np
+
+        keys = np.array(texts, dtype="S")
+        width = -(-keys.itemsize // 8) * 8
+
+        return keys.astype(f"S{width}").view(np.uint64).reshape(len(texts), width // 8)
+
+    def to_hashes(self, keys):
+        """ Return 64 bit hash for every row of given keys """
+        np = self._np
+
+        hashes = np.zeros(len(keys), dtype=np.uint64)
+
+        for column in keys.T:
+            hashes ^= column
+            hashes *= np.uint64(0x9E3779B97F4A7C15)
+            hashes ^= hashes >> np.uint64(29)
+
+        return hashes
+
+    def count(self, result, transactions):
+        """ Fill given TallyResult. Dict 'transactions' has option address as key
+        and list of its transactions as value. Return None without changing the
+        result if two voters have the same hash - use TallyEngine.count() then """
+        np = self._np
+
+        send = [[t for t in transactions.get(a, []) if t["type"] == "SendTx"] for a in result.addresses]
+        send_all = [t for trxs in send for t in trxs]
+
+        options = np.repeat(np.arange(len(send)), [len(trxs) for trxs in send])
+        timestamps = self.to_unix(list(map(itemgetter("timestamp"), send_all)))
+        voters = list(map(itemgetter("from"), send_all))
+        keys = self.to_keys(voters)
+        hashes = self.to_hashes(keys)
+        rows = np.arange(len(voters))
+
+        too_late = 0
+
+        if result.ending:
+            in_time = timestamps <= result.ending
+            too_late = int(len(in_time) - np.count_nonzero(in_time))
+
+            options = options[in_time]
+            timestamps = timestamps[in_time]
+            hashes = hashes[in_time]
+            rows = rows[in_time]
+
+        # Transactions of a voter are next to each other
+        order = np.argsort(hashes)
+        hashes = hashes[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = hashes[1:] != hashes[:-1]
+        starts = np.flatnonzero(first)
+        groups = np.cumsum(first) - 1
+
+        # All transactions in a group need to be from the same voter
+        same = np.flatnonzero(~first)
+        if (keys[rows[order[same]]] != keys[rows[order[starts[groups[same]]]]]).any():
+            logging.warning(f"Vote {result.vote_id}: Hash collision - counting without NumPy")
+            return None
+
+        # Later timestamp wins, on equal timestamps the later option
+        rank = (timestamps * max(len(send), 1) + options)[order]
+        best = rank == np.maximum.reduceat(rank, starts)[groups] if len(order) else first
+        winners = order[best]
+        groups = groups[best]
+        latest = np.ones(len(winners), dtype=bool)
+        latest[1:] = groups[1:] != groups[:-1]
+        latest = winners[latest]
+
+        options = options[latest]
+        timestamps = timestamps[latest]
+        voters = list(map(voters.__getitem__, rows[latest].tolist()))
+
+        # Identities need to be checked only for votes that would count
+        verified = self._plugin.api.verify_many(voters)
+        states = list(map(verified.__getitem__, voters))
+        valid = np.fromiter(map(bool, states), dtype=bool, count=len(voters))
+        result.failed = states.count(None)
+
+        options = options[valid]
+        voters = list(compress(voters, valid.tolist()))
+
+        result.voters.update(zip(voters, options.tolist()))
+        result.timestamps.update(zip(voters, timestamps[valid].tolist()))
+        result.counts = np.bincount(options, minlength=len(result.options)).tolist()
+
+        logging.info(
+            f"Vote {result.vote_id}: {result.total_votes} votes - "
+            f"{len(latest) - result.total_votes} not verified - "
+            f"{result.failed} lookups failed - "
+            f"{too_late} too late")
+
+        logging.debug(f"Vote {result.vote_id}: {result.counts}")
+        return result
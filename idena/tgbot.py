@@ -1,5 +1,8 @@
 import os
+import json
+import time
 import logging
+import threading
 import importlib
 import shutil
 import idena.emoji as emo
@@ -9,6 +12,17 @@ import idena.constants as con
 from importlib import reload
 from zipfile import ZipFile
 from idena.config import ConfigManager
+from idena.idena_api import IdenaAPI
+from idena.tally import TallyCache
+from idena.chart import ChartCache
+from idena.database import Database
+from idena.resources import ResourceCache
+from idena.workers import WorkerPool
+from idena.plugin import LazyPlugin
+from idena.profiler import StartupProfiler
+from idena.deadlines import DeadlineScheduler
+from idena.addresses import AddressIndex
+from idena.outbox import Outbox
 from telegram import ParseMode, Chat
 from telegram.ext import Updater, MessageHandler, Filters, CommandHandler
 from telegram.error import InvalidToken
@@ -21,6 +35,8 @@ class TelegramBot:
     def __init__(self, config: ConfigManager, token):
         self.config = config
 
+        profiler = StartupProfiler.get()
+
         read_timeout = self.config.get("telegram", "read_timeout")
         connect_timeout = self.config.get("telegram", "connect_timeout")
 
@@ -31,17 +47,81 @@ class TelegramBot:
         if connect_timeout:
             tgb_kwargs["connect_timeout"] = connect_timeout
 
-        try:
-            self.updater = Updater(token, request_kwargs=tgb_kwargs)
-        except InvalidToken as e:
-            logging.error(e)
-            exit("ERROR: Bot token not valid")
+        with profiler.phase("Updater"):
+            try:
+                self.updater = Updater(token, request_kwargs=tgb_kwargs)
+            except InvalidToken as e:
+                logging.error(e)
+                exit("ERROR: Bot token not valid")
 
         self.job_queue = self.updater.job_queue
         self.dispatcher = self.updater.dispatcher
 
-        # Load classes in folder 'plugins'
-        self._load_plugins()
+        with profiler.phase("Services"):
+            # Messages of all plugins within Telegram's flood limits
+            self.outbox = Outbox(
+                self.updater.bot,
+                threads=self.config.get("outbox", "threads"),
+                global_rate=self.config.get("outbox", "global_rate"),
+                chat_rate=self.config.get("outbox", "chat_rate"),
+                group_rate=self.config.get("outbox", "group_rate"))
+
+            # Access to IDENA API with one connection pool for all plugins
+            self.api = IdenaAPI(
+                base_url=self.config.get("idena", "base_url"),
+                timeout=self.config.get("idena", "timeout"),
+                workers=self.config.get("idena", "workers"),
+                pool_size=self.config.get("idena", "pool_size"),
+                retries=self.config.get("idena", "retries"),
+                backoff=self.config.get("idena", "backoff"),
+                pages=self.config.get("idena", "pages"))
+
+            # Results of votes that all plugins can reuse
+            self.tally_cache = TallyCache(
+                max_age=self.config.get("tally", "max_age"),
+                size=self.config.get("tally", "cache_size"))
+
+            # Threads that run the commands of all plugins
+            self.workers = WorkerPool(
+                size=self.config.get("workers", "size"),
+                queue_size=self.config.get("workers", "queue_size"),
+                plugin_limit=self.config.get("workers", "plugin_limit"))
+
+            # Wait times of commands in the log
+            stats_interval = self.config.get("workers", "stats_interval")
+            if stats_interval is None:
+                stats_interval = self.workers.stats_interval
+            if stats_interval:
+                self.job_queue.run_repeating(
+                    lambda bot, job: self.workers.log_stats(),
+                    stats_interval,
+                    first=stats_interval,
+                    name="worker_stats")
+
+            # Vote of every option address of open votes
+            self.addresses = AddressIndex()
+
+            # Jobs for the end of votes
+            self.deadlines = DeadlineScheduler(self.job_queue)
+
+            # Rendered result charts that all plugins can reuse
+            self.charts = ChartCache(
+                backend=self.config.get("chart", "backend"),
+                cache_size=self.config.get("chart", "cache_size"))
+
+        with profiler.phase("Migrations"):
+            # Create or update tables of global database
+            if self.config.get("database", "use_db"):
+                self._migrate_database()
+
+        with profiler.phase("Resources"):
+            # SQL statements and texts of all plugins in memory
+            self.resources = ResourceCache()
+            self._load_resources()
+
+        with profiler.phase("Plugins"):
+            # Load classes in folder 'plugins'
+            self._load_plugins()
 
         # Handler for file downloads (plugin updates)
         mh = MessageHandler(Filters.document, self._update_plugin)
@@ -50,12 +130,10 @@ class TelegramBot:
         # Handle all Telegram related errors
         self.dispatcher.add_error_handler(self._handle_tg_errors)
 
-        # Send message to admin
-        for admin in config.get("admin", "ids"):
-            try:
-                self.updater.bot.send_message(admin, f"{emo.DONE} Bot is up and running!")
-            except Exception as e:
-                logging.warning(f"Couldn't send startup message to ID {admin}: {e}")
+        with profiler.phase("Admin messages"):
+            # Send message to admin
+            for admin in config.get("admin", "ids"):
+                self.outbox.send(admin, f"{emo.DONE} Bot is up and running!", priority=Outbox.LOW)
 
     def bot_start_polling(self):
         """ Start the bot in polling mode """
@@ -119,6 +197,38 @@ class TelegramBot:
                     raise ex
         return {"success": True, "msg": "Plugin removed"}
 
+    def _migrate_database(self):
+        """ Apply new migrations from 'resources/migrations' to global database """
+        try:
+            db = Database.get(os.path.join(os.getcwd(), con.DIR_DAT, con.FILE_DAT))
+
+            for file in db.migrate(os.path.join(con.DIR_RES, con.DIR_MIG)):
+                logging.info(f"Migration '{file}' applied")
+        except Exception as e:
+            logging.error(e)
+            exit(f"ERROR: Migration of database failed: {e}")
+
+    def _load_resources(self):
+        """ Load global resources and make sure that all SQL statements are valid """
+        errors = self.resources.load(con.DIR_RES)
+
+        if self.config.get("database", "use_db"):
+            db = Database.get(os.path.join(os.getcwd(), con.DIR_DAT, con.FILE_DAT))
+
+            for name, sql in self.resources.files(con.DIR_RES).items():
+                if not name.endswith(".sql"):
+                    continue
+
+                try:
+                    db.check(sql)
+                except Exception as e:
+                    errors.append(f"Invalid SQL statement in '{name}': {e}")
+
+        if errors:
+            for error in errors:
+                logging.error(error)
+            exit(f"ERROR: Resources not valid: {errors[0]}")
+
     def _load_plugins(self):
         """ Load all plugins from the 'plugins' folder """
         try:
@@ -126,25 +236,77 @@ class TelegramBot:
                 for folder in folders:
                     if folder.startswith("_"):
                         continue
-                    self._load_plugin(f"{folder}.py")
+                    if self._is_lazy(folder):
+                        self._add_lazy_plugin(folder)
+                    else:
+                        self._load_plugin(f"{folder}.py")
                 break
         except Exception as e:
             logging.error(e)
 
+        # Import plugins that are loaded on demand in the background
+        if self.config.get("plugins", "warm_up"):
+            threading.Thread(target=self._warm_up, daemon=True).start()
+
     def _load_plugin(self, file):
         """ Load a single plugin """
         try:
             module_name, extension = os.path.splitext(file)
-            module_path = f"{con.DIR_SRC}.{con.DIR_PLG}.{module_name}.{module_name}"
-            module = importlib.import_module(module_path)
+            start = time.perf_counter()
 
-            with getattr(module, module_name.capitalize())(self) as plugin:
-                self._add_handler(plugin)
-                self.plugins.append(plugin)
-                logging.info(f"Plugin '{plugin.get_name()}' added")
+            plugin = self._create_plugin(module_name)
+            self._add_handler(plugin)
+            self.plugins.append(plugin)
+            logging.info(f"Plugin '{plugin.get_name()}' added")
+
+            StartupProfiler.get().plugin(module_name, time.perf_counter() - start)
         except Exception as e:
             logging.warning(f"File '{file}': {e}")
 
+    def _create_plugin(self, module_name):
+        """ Import plugin module and return new instance of the plugin """
+        module_path = f"{con.DIR_SRC}.{con.DIR_PLG}.{module_name}.{module_name}"
+        module = importlib.import_module(module_path)
+
+        with getattr(module, module_name.capitalize())(self) as plugin:
+            return plugin
+
+    def _is_lazy(self, module_name):
+        """ Return TRUE if plugin config has 'lazy' set to true """
+        cfg_path = os.path.join(con.DIR_SRC, con.DIR_PLG, module_name, con.DIR_CFG, f"{module_name}.json")
+
+        try:
+            with open(cfg_path, "r", encoding="utf8") as f:
+                return bool(json.load(f).get("lazy"))
+        except Exception as e:
+            logging.debug(f"{repr(e)} - Can't read '{cfg_path}'")
+            return False
+
+    def _add_lazy_plugin(self, module_name):
+        """ Add plugin that will only be imported when its command is used """
+        try:
+            start = time.perf_counter()
+
+            plugin = LazyPlugin(module_name, self._create_plugin)
+            self._add_handler(plugin)
+            self.plugins.append(plugin)
+            logging.info(f"Plugin '{plugin.get_name()}' added (lazy)")
+
+            StartupProfiler.get().plugin(module_name, time.perf_counter() - start)
+        except Exception as e:
+            logging.warning(f"Plugin '{module_name}': {e}")
+
+    def _warm_up(self):
+        """ Import plugins that are loaded on demand and modules for charts """
+        for plugin in list(self.plugins):
+            if isinstance(plugin, LazyPlugin):
+                try:
+                    plugin.load()
+                except Exception as e:
+                    logging.warning(f"Plugin '{plugin.get_name()}' can't be loaded: {e}")
+
+        self.charts.warm_up()
+
     def _add_handler(self, plugin):
         """ Add CommandHandler for given plugin """
         handle = plugin.get_handle()
@@ -175,7 +337,7 @@ class TelegramBot:
             return
 
         # Check if user that triggered the command is allowed to execute it
-        if update.effective_user.id not in self.config.get("admin", "ids"):
+        if update.effective_user.id not in self.config.get_set("admin", "ids"):
             return
 
         name = update.message.effective_attachment.file_name.lower()
@@ -111,13 +111,27 @@ def now():
 
 
 def generate_eth_wallet():
-    from ecdsa import SigningKey, SECP256k1
-    privkey = SigningKey.generate(curve=SECP256k1)
-    public = privkey.get_verifying_key().to_string()
+    """ Generate new private key and its address. Uses the native
+    libsecp256k1 (package 'coincurve') if available, otherwise 'ecdsa' """
+    try:
+        from coincurve import PrivateKey
+        privkey = PrivateKey()
+        secret = privkey.secret
+        public = privkey.public_key.format(compressed=False)[1:]
+    except ImportError:
+        from ecdsa import SigningKey, SECP256k1
+        privkey = SigningKey.generate(curve=SECP256k1)
+        secret = privkey.to_string()
+        public = privkey.get_verifying_key().to_string()
+
+    try:
+        import sha3
+        keccak = sha3.keccak_256()
+    except ImportError:
+        from Crypto.Hash import keccak
+        keccak = keccak.new(digest_bits=256)
 
-    import sha3
-    keccak = sha3.keccak_256()
     keccak.update(public)
     address = keccak.hexdigest()[24:]
 
-    return {"address": f"0x{address}", "privkey": privkey.to_string().hex()}
+    return {"address": f"0x{address}", "privkey": secret.hex()}
@@ -0,0 +1,108 @@
+import os
+import logging
+
+from threading import Lock, Timer
+from collections import defaultdict
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+
+class FileWatcher(FileSystemEventHandler):
+    """ One observer thread for all watched files of the process. Callbacks
+    are registered for a single file or for all files of a directory and get
+    the path of the changed file. Editors often write a file more than once
+    when saving, so a callback is executed only after no further event for
+    the file happened within 'delay' seconds. Use 'FileWatcher.get()' """
+
+    delay = 0.5  # Seconds to wait for further events of a file
+
+    _instance = None
+    _instance_lock = Lock()
+
+    def __init__(self):
+        # Absolute file path -> list of callbacks
+        self._files = defaultdict(list)
+        # Absolute directory path -> list of callbacks
+        self._dirs = defaultdict(list)
+        # Absolute file path -> timer that will execute the callbacks
+        self._timers = dict()
+        # Directories that the observer watches
+        self._scheduled = set()
+        self._lock = Lock()
+
+        self._observer = Observer()
+        self._observer.start()
+
+    @classmethod
+    def get(cls):
+        """ Return watcher of the process """
+        with cls._instance_lock:
+            if not cls._instance:
+                cls._instance = cls()
+
+            return cls._instance
+
+    def watch(self, path, callback):
+        """ Execute callback if given file changes """
+        path = os.path.abspath(path)
+
+        with self._lock:
+            self._files[path].append(callback)
+
+        self._schedule(os.path.dirname(path))
+
+    def watch_dir(self, directory, callback):
+        """ Execute callback if any file in given directory changes """
+        directory = os.path.abspath(directory)
+
+        with self._lock:
+            self._dirs[directory].append(callback)
+
+        self._schedule(directory)
+
+    def _schedule(self, directory):
+        with self._lock:
+            if directory in self._scheduled:
+                return
+
+            if not os.path.isdir(directory):
+                logging.debug(f"Directory '{directory}' doesn't exist and can't be watched")
+                return
+
+            self._scheduled.add(directory)
+
+        self._observer.schedule(self, directory)
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+
+        for path in filter(None, [event.src_path, getattr(event, "dest_path", None)]):
+            path = os.path.abspath(path)
+
+            with self._lock:
+                if path not in self._files and os.path.dirname(path) not in self._dirs:
+                    continue
+
+                timer = self._timers.get(path)
+
+                if timer:
+                    timer.cancel()
+
+                timer = Timer(self.delay, self._changed, args=[path])
+                timer.daemon = True
+                self._timers[path] = timer
+
+            timer.start()
+
+    def _changed(self, path):
+        """ Execute all callbacks for given file """
+        with self._lock:
+            self._timers.pop(path, None)
+            callbacks = self._files.get(path, []) + self._dirs.get(os.path.dirname(path), [])
+
+        for callback in callbacks:
+            try:
+                callback(path)
+            except Exception as e:
+                logging.error(f"{repr(e)} - Can't handle change of '{path}'")
@@ -0,0 +1,107 @@
+import time
+import logging
+
+from threading import Lock
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WorkerPool:
+    """ Runs plugin commands with a fixed number of threads. Only 'plugin_limit'
+    commands of a plugin run at the same time, others of that plugin wait.
+    If 'queue_size' commands are already waiting, new ones will be rejected """
+
+    size = 8  # Number of threads
+    queue_size = 50  # Max number of waiting commands
+    plugin_limit = 2  # Max running commands per plugin
+    slow_wait = 5  # Seconds of waiting after which a warning will be logged
+    stats_interval = 3600  # Seconds between logging of stats
+
+    def __init__(self, size=None, queue_size=None, plugin_limit=None):
+        if size:
+            self.size = size
+        if queue_size is not None:
+            self.queue_size = queue_size
+        if plugin_limit:
+            self.plugin_limit = plugin_limit
+
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="worker")
+        self._lock = Lock()
+
+        # Number of commands that were accepted but didn't start yet
+        self._pending = 0
+        # Plugin name -> number of running commands
+        self._running = defaultdict(int)
+        # Plugin name -> commands that wait for a free slot of the plugin
+        self._waiting = defaultdict(deque)
+        # Plugin name -> [done, rejected, total wait time, max wait time]
+        self._stats = defaultdict(lambda: [0, 0, 0.0, 0.0])
+
+    def submit(self, name, fn, *args, limit=None, **kwargs):
+        """ Run given function for plugin with given name. Return FALSE
+        if the queue is full and the function will not be executed """
+        task = (time.monotonic(), name, fn, args, kwargs)
+
+        with self._lock:
+            if self._pending >= self.queue_size:
+                self._stats[name][1] += 1
+                logging.warning(f"Worker queue full - Command of plugin '{name}' rejected")
+                return False
+
+            self._pending += 1
+
+            if self._running[name] < (limit or self.plugin_limit):
+                self._running[name] += 1
+                self._executor.submit(self._run, task, limit)
+            else:
+                self._waiting[name].append(task)
+
+        return True
+
+    def _run(self, task, limit):
+        queued, name, fn, args, kwargs = task
+        wait = time.monotonic() - queued
+
+        with self._lock:
+            self._pending -= 1
+
+            stats = self._stats[name]
+            stats[0] += 1
+            stats[2] += wait
+            stats[3] = max(stats[3], wait)
+
+        if wait > self.slow_wait:
+            logging.warning(f"Command of plugin '{name}' waited {wait:.1f} seconds")
+
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            logging.error(f"{repr(e)} - Command of plugin '{name}' failed")
+        finally:
+            with self._lock:
+                if self._waiting[name]:
+                    self._executor.submit(self._run, self._waiting[name].popleft(), limit)
+                else:
+                    self._running[name] -= 1
+
+    def stats(self):
+        """ Return dict with plugin name as key and dict with number
+        of done, rejected, running and waiting commands as well as
+        average and max wait time in seconds as value """
+        with self._lock:
+            return {name: {
+                "done": done,
+                "rejected": rejected,
+                "running": self._running[name],
+                "waiting": len(self._waiting[name]),
+                "wait_avg": total / done if done else 0.0,
+                "wait_max": longest
+            } for name, (done, rejected, total, longest) in self._stats.items()}
+
+    def log_stats(self):
+        """ Write stats of all plugins that had commands to the log """
+        for name, s in sorted(self.stats().items()):
+            logging.info(
+                f"Worker stats for plugin '{name}': {s['done']} done - {s['rejected']} rejected - "
+                f"{s['running']} running - {s['waiting']} waiting - "
+                f"wait avg {s['wait_avg']:.2f}s - max {s['wait_max']:.2f}s")
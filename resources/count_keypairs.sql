@@ -0,0 +1,2 @@
+SELECT COUNT(*)
+FROM keypairs
\ No newline at end of file
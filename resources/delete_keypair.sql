@@ -0,0 +1,2 @@
+DELETE FROM keypairs
+WHERE address = ?
\ No newline at end of file
@@ -0,0 +1,2 @@
+INSERT INTO keypairs (address, privkey)
+VALUES (?, ?)
\ No newline at end of file
@@ -0,0 +1,2 @@
+INSERT OR REPLACE INTO results (vote_id, option_index, votes)
+VALUES (?, ?, ?)
\ No newline at end of file
@@ -0,0 +1,2 @@
+INSERT OR IGNORE INTO transactions (hash, address, sender, type, timestamp)
+VALUES (?, ?, ?, ?, ?)
\ No newline at end of file
@@ -0,0 +1,2 @@
+INSERT OR REPLACE INTO voters (vote_id, voter, option_index, timestamp)
+VALUES (?, ?, ?, ?)
\ No newline at end of file
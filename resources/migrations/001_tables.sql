@@ -0,0 +1,52 @@
+-- Tables that were created by the plugins before migrations existed
+
+CREATE TABLE IF NOT EXISTS votes (
+    vote_id TEXT NOT NULL,
+    creator TEXT NOT NULL,
+	question TEXT NOT NULL,
+	created DATETIME DEFAULT CURRENT_TIMESTAMP,
+	ending DATETIME,
+	PRIMARY KEY (vote_id)
+);
+
+CREATE TABLE IF NOT EXISTS options (
+    vote_id TEXT NOT NULL,
+    option TEXT NOT NULL,
+    address TEXT NOT NULL,
+    privkey TEXT NOT NULL,
+    PRIMARY KEY (vote_id, option),
+    FOREIGN KEY(vote_id) REFERENCES votes(vote_id)
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    hash TEXT NOT NULL,
+    address TEXT NOT NULL,
+    sender TEXT NOT NULL,
+    type TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    PRIMARY KEY (hash, address)
+);
+
+CREATE TABLE IF NOT EXISTS sync (
+    address TEXT NOT NULL,
+    last_hash TEXT NOT NULL,
+    last_timestamp TEXT NOT NULL,
+    PRIMARY KEY (address)
+);
+
+CREATE TABLE IF NOT EXISTS results (
+    vote_id TEXT NOT NULL,
+    option_index INTEGER NOT NULL,
+    votes INTEGER NOT NULL,
+    PRIMARY KEY (vote_id, option_index),
+    FOREIGN KEY(vote_id) REFERENCES votes(vote_id)
+);
+
+CREATE TABLE IF NOT EXISTS voters (
+    vote_id TEXT NOT NULL,
+    voter TEXT NOT NULL,
+    option_index INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    PRIMARY KEY (vote_id, voter),
+    FOREIGN KEY(vote_id) REFERENCES votes(vote_id)
+);
@@ -0,0 +1,9 @@
+-- Indexes for vote lookups, listing and deadlines
+
+CREATE INDEX IF NOT EXISTS idx_options_address ON options (address);
+
+CREATE INDEX IF NOT EXISTS idx_votes_created ON votes (created);
+
+CREATE INDEX IF NOT EXISTS idx_votes_ending ON votes (ending);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_address ON transactions (address, timestamp);
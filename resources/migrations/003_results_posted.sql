@@ -0,0 +1,9 @@
+-- Votes for which the result was already sent to the admins
+
+ALTER TABLE votes ADD COLUMN results_posted INTEGER NOT NULL DEFAULT 0;
+
+-- Don't send results of votes that ended before this migration
+UPDATE votes SET results_posted = 1 WHERE ending <= datetime('now', 'localtime');
+
+-- Only contains votes that still need their result to be posted
+CREATE INDEX IF NOT EXISTS idx_votes_pending ON votes (ending) WHERE results_posted = 0 AND ending IS NOT NULL;
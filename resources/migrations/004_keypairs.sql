@@ -0,0 +1,7 @@
+-- Generated keypairs that are not used for a vote option yet
+
+CREATE TABLE IF NOT EXISTS keypairs (
+    address TEXT NOT NULL,
+    privkey TEXT NOT NULL,
+    PRIMARY KEY (address)
+);
@@ -0,0 +1,4 @@
+SELECT address, privkey
+FROM keypairs
+ORDER BY rowid
+LIMIT ?
\ No newline at end of file
@@ -0,0 +1,5 @@
+SELECT options.address, votes.vote_id, votes.ending
+FROM votes INDEXED BY idx_votes_ending
+JOIN options ON options.vote_id = votes.vote_id
+WHERE votes.ending IS NULL OR votes.ending > ?
+ORDER BY votes.vote_id, options.rowid
\ No newline at end of file
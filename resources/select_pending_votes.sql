@@ -0,0 +1,4 @@
+SELECT vote_id, ending
+FROM votes
+WHERE results_posted = 0 AND ending IS NOT NULL
+ORDER BY ending
\ No newline at end of file
@@ -0,0 +1,3 @@
+SELECT option_index, votes
+FROM results
+WHERE vote_id = ?
\ No newline at end of file
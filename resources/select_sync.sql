@@ -0,0 +1,3 @@
+SELECT last_hash, last_timestamp
+FROM sync
+WHERE address = ?
\ No newline at end of file
@@ -0,0 +1,4 @@
+SELECT hash, sender, type, timestamp
+FROM transactions
+WHERE address = ?
+ORDER BY timestamp DESC, rowid DESC
\ No newline at end of file
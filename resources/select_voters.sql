@@ -0,0 +1,3 @@
+SELECT voter, option_index, timestamp
+FROM voters
+WHERE vote_id = ?
\ No newline at end of file
@@ -1,2 +1,4 @@
-SELECT *
-FROM votes
\ No newline at end of file
+SELECT vote_id, creator, question, created, ending
+FROM votes
+ORDER BY created DESC, rowid DESC
+LIMIT max(?, 1)
\ No newline at end of file
@@ -0,0 +1,3 @@
+UPDATE votes
+SET results_posted = ?
+WHERE vote_id = ? AND results_posted = ?
\ No newline at end of file
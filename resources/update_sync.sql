@@ -0,0 +1,2 @@
+INSERT OR REPLACE INTO sync (address, last_hash, last_timestamp)
+VALUES (?, ?, ?)
\ No newline at end of file
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+import idena.constants as con
+
+from idena.database import Database
+
+
+class TestQueryPlans(unittest.TestCase):
+    """ Frequent queries need to use indexes instead of scanning whole tables """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.mkdtemp(prefix="idena_test_")
+        cls.db = Database.get(os.path.join(cls.tmp, "global.db"))
+        cls.db.migrate(os.path.join(con.DIR_RES, con.DIR_MIG))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+
+    def plan(self, filename):
+        """ Return query plan of given global SQL file as one string """
+        with open(os.path.join(con.DIR_RES, filename), encoding="utf8") as f:
+            sql = f.read()
+
+        rows = self.db.execute(f"EXPLAIN QUERY PLAN {sql}", *[None] * sql.count("?"))
+        return "\n".join(row[3] for row in rows)
+
+    def assertUsesIndex(self, filename, table, index):
+        plan = self.plan(filename)
+
+        self.assertIn(f"USING INDEX {index}", plan)
+        self.assertNotIn(f"SCAN {table}\n", f"{plan}\n")
+
+    def test_select_votes(self):
+        self.assertUsesIndex("select_votes.sql", "votes", "idx_votes_created")
+
+    def test_select_votes_limit(self):
+        with open(os.path.join(con.DIR_RES, "select_votes.sql"), encoding="utf8") as f:
+            sql = f.read()
+
+        with self.db.transaction() as cur:
+            cur.executemany(
+                "INSERT INTO votes (vote_id, creator, question) VALUES (?, ?, ?)",
+                [(f"limit{i}", "0", "Question?") for i in range(3)])
+
+        try:
+            self.assertEqual(len(self.db.execute(sql, 2)), 2)
+
+            # SQLite returns all rows for a negative limit
+            self.assertEqual(len(self.db.execute(sql, -1)), 1)
+            self.assertEqual(len(self.db.execute(sql, 0)), 1)
+        finally:
+            self.db.execute("DELETE FROM votes WHERE vote_id LIKE 'limit%'")
+
+    def test_select_vote(self):
+        self.assertUsesIndex("select_vote.sql", "votes", "sqlite_autoindex_votes_1")
+        self.assertUsesIndex("select_vote.sql", "options", "sqlite_autoindex_options_1")
+
+    def test_select_pending_votes(self):
+        self.assertUsesIndex("select_pending_votes.sql", "votes", "idx_votes_pending")
+
+    def test_select_transactions(self):
+        self.assertUsesIndex("select_transactions.sql", "transactions", "idx_transactions_address")
+
+    def test_select_open_options(self):
+        self.assertUsesIndex("select_open_options.sql", "votes", "idx_votes_ending")
+        self.assertUsesIndex("select_open_options.sql", "options", "sqlite_autoindex_options_1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import os
+import time
+import random
+import unittest
+
+from copy import deepcopy
+from idena.tally import TallyEngine, TallyResult, VectorTally
+
+
+class Api:
+    """ Replaces IdenaAPI. Every address in 'states' has that state, all others are verified """
+
+    def __init__(self, states=None):
+        self.states = states or dict()
+
+    def verify_many(self, addresses):
+        return {a: self.states.get(a, True) for a in addresses}
+
+
+class Plugin:
+    """ Provides what TallyEngine needs from an IdenaPlugin. 'rows' is the result of select_vote.sql """
+
+    def __init__(self, rows=None, states=None):
+        self.api = Api(states)
+        self.rows = rows or list()
+
+    def get_global_resource(self, filename):
+        return filename
+
+    def execute_global_sql(self, sql, *args):
+        return {"success": True, "data": self.rows}
+
+
+def trx(sender, timestamp, type="SendTx"):
+    return {"hash": f"{sender}{timestamp}", "from": sender, "type": type, "timestamp": timestamp}
+
+
+def result(options=2, ending=None):
+    return TallyResult("vote", "Question?", 0, ending,
+                       [str(i) for i in range(options)], [f"0x{i}" for i in range(options)])
+
+
+class TestCount(unittest.TestCase):
+    """ Latest transaction of a verified identity counts """
+
+    def setUp(self):
+        self.engine = TallyEngine(Plugin())
+
+    def test_revote(self):
+        # Voted for option 0, then 1 and then 0 again
+        res = self.engine.count(result(), {
+            "0x0": [trx("0xa", "2020-01-01T12:02:00Z"), trx("0xa", "2020-01-01T12:00:00Z")],
+            "0x1": [trx("0xa", "2020-01-01T12:01:00Z")]})
+
+        self.assertEqual(res.voters, {"0xa": 0})
+        self.assertEqual(res.counts, [1, 0])
+
+    def test_same_time(self):
+        res = self.engine.count(result(), {
+            "0x0": [trx("0xa", "2020-01-01T12:00:00Z")],
+            "0x1": [trx("0xa", "2020-01-01T12:00:00Z")]})
+
+        self.assertEqual(res.voters, {"0xa": 1})
+
+    def test_not_verified(self):
+        self.engine = TallyEngine(Plugin(states={"0xb": False, "0xc": None}))
+
+        res = self.engine.count(result(), {
+            "0x0": [trx("0xa", "2020-01-01T12:00:00Z"), trx("0xb", "2020-01-01T12:00:00Z")],
+            "0x1": [trx("0xc", "2020-01-01T12:00:00Z"), trx("0xd", "2020-01-01T12:00:00Z", "Other")]})
+
+        self.assertEqual(res.voters, {"0xa": 0})
+        self.assertEqual(res.counts, [1, 0])
+        self.assertEqual(res.failed, 1)
+
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@unittest.skipUnless(numpy, "NumPy isn't installed")
+class TestVectorTally(unittest.TestCase):
+    """ VectorTally needs to count exactly like TallyEngine.count() """
+
+    rounds = 200
+
+    def random_vote(self, rnd):
+        """ Return TallyResult, transactions and identity states of a random vote """
+        res = result(rnd.randint(1, 5), TallyEngine.to_unix("2020-01-01T12:00:30Z"))
+        senders = [f"0x{i:040x}" for i in range(rnd.randint(1, 30))]
+        # Few different timestamps, so that there are ties and transactions after the end
+        times = [f"2020-01-01T12:00:{s:02}Z" for s in range(20, 40)]
+
+        transactions = {a: list() for a in res.addresses}
+        for i in range(rnd.randint(0, 100)):
+            address = rnd.choice(res.addresses)
+            type = "SendTx" if rnd.random() < 0.9 else "OnlineStatusTx"
+            transactions[address].append(trx(rnd.choice(senders), rnd.choice(times), type))
+
+        states = {a: rnd.choice([True, True, False, None]) for a in senders}
+        return res, transactions, states
+
+    def test_random(self):
+        rnd = random.Random(42)
+
+        for i in range(self.rounds):
+            res, transactions, states = self.random_vote(rnd)
+            plugin = Plugin(states=states)
+
+            expected = TallyEngine(plugin, vector_min=float("inf")).count(deepcopy(res), transactions)
+            counted = VectorTally(plugin).count(deepcopy(res), transactions)
+
+            with self.subTest(round=i):
+                self.assertEqual(counted.counts, expected.counts)
+                self.assertEqual(counted.voters, expected.voters)
+                self.assertEqual(counted.timestamps, expected.timestamps)
+                self.assertEqual(counted.failed, expected.failed)
+
+    def test_empty(self):
+        counted = VectorTally(Plugin()).count(result(), dict())
+
+        self.assertEqual(counted.counts, [0, 0])
+        self.assertEqual(counted.voters, dict())
+
+
+@unittest.skipUnless(hasattr(time, "tzset"), "Time zone can't be changed")
+class TestVoteEnd(unittest.TestCase):
+    """ End of a vote is the local time that its creator entered """
+
+    def setUp(self):
+        self.tz = os.environ.get("TZ")
+        os.environ["TZ"] = "America/New_York"
+        time.tzset()
+
+    def tearDown(self):
+        if self.tz is None:
+            del os.environ["TZ"]
+        else:
+            os.environ["TZ"] = self.tz
+        time.tzset()
+
+    def test_cutoff(self):
+        rows = [
+            ("vote", "0", "Question?", "Yes", "0xyes", "", "2020-01-01 10:00:00", "2020-01-01 12:00:00"),
+            ("vote", "0", "Question?", "No", "0xno", "", "2020-01-01 10:00:00", "2020-01-01 12:00:00")]
+
+        engine = TallyEngine(Plugin(rows))
+        result = engine.load("vote")
+
+        # 12:00 in New York is 17:00 UTC
+        self.assertEqual(result.ending, TallyEngine.to_unix("2020-01-01T17:00:00Z"))
+
+        engine.count(result, {
+            "0xyes": [trx("0xa", "2020-01-01T12:30:00Z"), trx("0xb", "2020-01-01T17:00:00Z")],
+            "0xno": [trx("0xc", "2020-01-01T17:00:01Z")]})
+
+        self.assertEqual(result.voters, {"0xa": 0, "0xb": 0})
+        self.assertEqual(result.counts, [2, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()